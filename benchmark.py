@@ -0,0 +1,209 @@
+"""Reproducible benchmarks for the knowledge package and MinesweeperAI.
+
+Example:
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --output results.json
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from knowledge import *
+from minesweeper import Minesweeper, MinesweeperAI
+
+SIZES = [(5, 5), (9, 9), (16, 16), (16, 30), (50, 50)]
+DENSITIES = [0.1, 0.15, 0.2]
+SEED = 0
+ENTAILS_QUERIES = 16
+EVALUATIONS = 100
+
+
+def position(height: int, width: int, probability_mine: float, seed: int = SEED, fraction: float = 0.5):
+    """Play a seeded game until `fraction` of the safe cells are revealed.
+
+    Returns the game and the reveals in order as (cell, neighbors, count), so
+    benchmarks can rebuild the same knowledge without replaying the solver.
+    """
+    game = Minesweeper(height, width, probability_mine, rng=seed)
+    agent = MinesweeperAI(height, width, probability_mine)
+    rng = random.Random(seed)
+    reveals = []
+    mines, safes = agent.make_move()
+    while len(game.safes_found) < fraction * len(game.safes):
+        for mine in mines:
+            game.flagging(mine, Minesweeper.BOT)
+        if not safes:
+            hidden = sorted(game.safes - game.safes_found)
+            if not hidden:
+                break
+            safes = {rng.choice(hidden)}
+        revealed = [cell for safe in safes for cell in game.reveal(safe, Minesweeper.BOT)]
+        reveals.extend((cell, game.get_neighbors(cell), game.get_count(cell)) for cell in revealed)
+        mines, safes = agent.observe(((cell, game.get_count(cell)) for cell in revealed), mines=mines)
+    return game, reveals
+
+
+def fed_agent(height: int, width: int, probability_mine: float, reveals) -> MinesweeperAI:
+    agent = MinesweeperAI(height, width, probability_mine)
+    for cell, neighbors, count in reveals:
+        agent.mark_safe(cell)
+        agent.add_knowledge(neighbors, count)
+    return agent
+
+
+def cases(height: int, width: int, probability_mine: float) -> dict[str, Callable[[], Callable[[], object]]]:
+    """Map each benchmark name to a setup function returning the operation to time.
+
+    Every operation works on the same seeded mid-game position: the reveals
+    made while playing until half of the safe cells are open.
+    """
+    _, reveals = position(height, width, probability_mine)
+
+    def setup_board():
+        board = Minesweeper(height, width, probability_mine, rng=SEED)
+        return board.setup_board
+
+    def add_knowledge():
+        agent = MinesweeperAI(height, width, probability_mine)
+
+        def ingest():
+            for cell, neighbors, count in reveals:
+                agent.mark_safe(cell)
+                agent.add_knowledge(neighbors, count)
+        return ingest
+
+    def make_move():
+        return fed_agent(height, width, probability_mine, reveals).make_move
+
+    agent = fed_agent(height, width, probability_mine, reveals)
+    knowledge = And(*agent.knowledge.operands)
+    frontier = sorted(knowledge.propositions - agent.discovered.keys())[:ENTAILS_QUERIES]
+
+    def entails():
+        def query():
+            for p in frontier:
+                knowledge.entails(p, agent.discovered)
+                knowledge.entails(Not(p), agent.discovered)
+        return query
+
+    def evaluate():
+        rng = random.Random(SEED)
+        propositions = sorted(knowledge.propositions)
+
+        def assign_and_evaluate():
+            for _ in range(EVALUATIONS):
+                knowledge.evaluate({p: rng.random() < probability_mine for p in propositions})
+        return assign_and_evaluate
+
+    return {
+        "Minesweeper.setup_board": setup_board,
+        "MinesweeperAI.add_knowledge": add_knowledge,
+        "MinesweeperAI.make_move": make_move,
+        "Connective.entails": entails,
+        "Connective.evaluate": evaluate,
+    }
+
+
+def measure(setup: Callable[[], Callable[[], object]], repeat: int, budget: float) -> dict:
+    """Time `repeat` runs (fewer if over `budget` seconds), each on a fresh setup."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        operation = setup()
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+        if time.perf_counter() - started > budget and len(latencies) >= 3:
+            break
+
+    tracemalloc.start()
+    operation = setup()
+    tracemalloc.reset_peak()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "runs": len(latencies),
+        "ops_per_second": len(latencies) / total if total else float("inf"),
+        "p50_seconds": statistics.median(latencies) if latencies else 0.0,
+        "p99_seconds": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else 0.0,
+        "peak_bytes": peak,
+    }
+
+
+def run(sizes: list[tuple[int, int]], densities: list[float], repeat: int, budget: float) -> dict[str, dict]:
+    results = {}
+    for height, width in sizes:
+        for probability_mine in densities:
+            for name, setup in cases(height, width, probability_mine).items():
+                key = f"{name}/{height}x{width}/p{probability_mine}"
+                results[key] = measure(setup, repeat, budget)
+                print(f"{key}: {results[key]['ops_per_second']:.1f} ops/s", file=sys.stderr)
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Return a message for every case whose median latency is over `tolerance` above the baseline.
+
+    The median is compared rather than ops/sec so a single slow outlier run
+    does not fail the comparison.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        expected = baseline[key]["p50_seconds"]
+        if result["p50_seconds"] > expected * (1 + tolerance):
+            regressions.append(
+                f"REGRESSION {key}: p50 {result['p50_seconds'] * 1e3:.3f} ms "
+                f"vs baseline {expected * 1e3:.3f} ms"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=[f"{h}x{w}" for h, w in SIZES],
+                        help="board sizes as HEIGHTxWIDTH")
+    parser.add_argument("--densities", nargs="+", type=float, default=DENSITIES)
+    parser.add_argument("--repeat", type=int, default=50, help="maximum runs per case")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds per case before stopping early")
+    parser.add_argument("--output", default="-", help="JSON results file, '-' for stdout")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative increase of the median latency")
+    parser.add_argument("--save-baseline", help="write the results as a new baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [tuple(map(int, size.lower().split("x"))) for size in args.sizes]
+    results = run(sizes, args.densities, args.repeat, args.budget)
+    report = {"seed": SEED, "python": sys.version.split()[0], "results": results}
+
+    if args.output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline)["results"], args.tolerance)
+        for message in regressions:
+            print(message, file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""A corpus of hard mid-game positions with ground-truth labels, for stressing the solver.
+
+Positions come from seeded games played by MinesweeperAI; from each game the
+turns with the most cells left undecided are kept. Every stored position is
+labelled independently of the AI: the constraints of its revealed numbers
+are solved component by component with `KnowledgeBase.backbone`, and each
+frontier cell is labelled safe, mine or undetermined.
+
+Example:
+    python corpus.py generate --positions 500 --height 16 --width 30 --probability-mine 0.2 --output corpus.jsonl
+    python corpus.py check corpus.jsonl --output check.jsonl
+"""
+import argparse
+import heapq
+import itertools
+import json
+import sys
+import time
+from typing import Iterator
+
+import record
+from knowledge import *
+from minesweeper import Minesweeper, MinesweeperAI
+
+VERSION = 1
+PER_GAME = 2
+MIN_UNDETERMINED = 4
+
+
+def frontier(game: Minesweeper, revealed: set[tuple[int, int]]) -> set[tuple[int, int]]:
+    """Unrevealed cells next to a revealed one."""
+    return {
+        neighbor
+        for cell in revealed
+        for neighbor in game.get_neighbors(cell)
+        if neighbor not in revealed
+    }
+
+
+def label(game: Minesweeper, revealed: set[tuple[int, int]]) -> tuple[dict[tuple[int, int], bool | None], int]:
+    """Map every frontier cell to True (mine), False (safe) or None (undetermined), and count the components.
+
+    Flags are not trusted: flagged cells are variables like any other hidden cell.
+    """
+    knowledge = KnowledgeBase()
+    for cell in revealed:
+        hidden = [Proposition(neighbor) for neighbor in game.get_neighbors(cell) if neighbor not in revealed]
+        if hidden:
+            knowledge.add(Exactly(game.get_count(cell), *hidden))
+
+    labels = {}
+    components = knowledge.components()
+    for component in components:
+        for cell, state in knowledge.backbone(component).items():
+            assert state is None or state == game.is_mine(cell.statement), f"{cell} labelled against the board"
+            labels[cell.statement] = state
+    return labels, len(components)
+
+
+def positions(seed: int,
+              height: int,
+              width: int,
+              probability_mine: float,
+              per_game: int = PER_GAME,
+              min_undetermined: int = MIN_UNDETERMINED) -> list[dict]:
+    """Play one seeded game and return its `per_game` hardest positions as corpus entries.
+
+    Turns are ranked by how many frontier cells the AI left undecided, then by
+    frontier length; only those with at least `min_undetermined` are labelled.
+    """
+    game = Minesweeper(height, width, probability_mine, rng=seed)
+    agent = MinesweeperAI(height, width, probability_mine)
+    hardest: list[tuple[int, int, int, set, set]] = []
+    mines, safes = agent.make_move()
+    for turn in itertools.count():
+        if game.won():
+            break
+        revealed = set(game.safes_found)
+        cells = frontier(game, revealed)
+        undecided = len(cells - mines - safes - set(game.mines_found))
+        if undecided >= min_undetermined:
+            entry = (undecided, len(cells), turn, revealed, set(game.mines_found))
+            if len(hardest) < per_game:
+                heapq.heappush(hardest, entry)
+            else:
+                heapq.heappushpop(hardest, entry)
+
+        if not mines and not safes:
+            guess = agent.make_guess()
+            if guess is None:
+                break
+            safes = {guess}
+        if any(game.is_mine(safe) for safe in safes):
+            break
+        for mine in mines:
+            game.flagging(mine, Minesweeper.BOT)
+        opened = [cell for safe in safes for cell in game.reveal(safe, Minesweeper.BOT)]
+        mines, safes = agent.observe(((cell, game.get_count(cell)) for cell in opened), mines=mines)
+
+    entries = []
+    for _, _, turn, revealed, flagged in sorted(hardest, reverse=True):
+        labels, components = label(game, revealed)
+        undetermined = [cell for cell, state in labels.items() if state is None]
+        if len(undetermined) < min_undetermined:
+            continue
+        entries.append({
+            "version": VERSION,
+            "seed": seed,
+            "turn": turn,
+            "height": height,
+            "width": width,
+            "probability_mine": probability_mine,
+            "mines": record.pack_cells(height, width, game.mines),
+            "revealed": record.pack_cells(height, width, revealed),
+            "flagged": record.pack_cells(height, width, flagged),
+            "frontier": len(labels),
+            "components": components,
+            "labels": {
+                "safe": record.pack_cells(height, width, (cell for cell, state in labels.items() if state is False)),
+                "mine": record.pack_cells(height, width, (cell for cell, state in labels.items() if state is True)),
+                "undetermined": record.pack_cells(height, width, undetermined),
+            },
+        })
+    return entries
+
+
+def generate(count: int,
+             height: int,
+             width: int,
+             probability_mine: float,
+             seed: int = 0,
+             per_game: int = PER_GAME,
+             min_undetermined: int = MIN_UNDETERMINED) -> Iterator[dict]:
+    """Yield `count` entries from games seeded `seed`, `seed + 1`, ..."""
+    for game_seed in itertools.count(seed):
+        for entry in positions(game_seed, height, width, probability_mine, per_game, min_undetermined):
+            yield entry
+            count -= 1
+            if count <= 0:
+                return
+
+
+def position(entry: dict) -> tuple[Minesweeper, list[tuple[int, int]], list[tuple[int, int]]]:
+    """The entry's board with its revealed and flagged cells marked, and those cells."""
+    height, width = entry["height"], entry["width"]
+    game = Minesweeper(height, width, layout=record.unpack_cells(height, width, entry["mines"]))
+    revealed = record.unpack_cells(height, width, entry["revealed"])
+    flagged = record.unpack_cells(height, width, entry["flagged"])
+    for cell in flagged:
+        game.flagging(cell, Minesweeper.BOT)
+    for cell in revealed:
+        game.mark_safe(cell, Minesweeper.BOT)
+    return game, revealed, flagged
+
+
+def check(entry: dict, move_budget: float | None = None, **options) -> dict:
+    """Solve the position with a fresh MinesweeperAI and compare its claims with the labels.
+
+    `unsound` counts claims that contradict a label or decide an undetermined
+    cell; `missed` counts labelled cells the AI left undecided, which should
+    be none without a `move_budget`. `options` are passed to MinesweeperAI.
+    """
+    height, width = entry["height"], entry["width"]
+    game, revealed, flagged = position(entry)
+    labels = {
+        cell: state
+        for name, state in (("safe", False), ("mine", True), ("undetermined", None))
+        for cell in record.unpack_cells(height, width, entry["labels"][name])
+    }
+    agent = MinesweeperAI(height, width, entry["probability_mine"], **options)
+    try:
+        start = time.perf_counter()
+        deadline = None if move_budget is None else time.monotonic() + move_budget
+        mines, safes = agent.observe(
+            ((cell, game.get_count(cell)) for cell in revealed), mines=flagged, deadline=deadline
+        )
+        seconds = time.perf_counter() - start
+    finally:
+        agent.close()
+
+    claims = {cell: True for cell in mines} | {cell: False for cell in safes}
+    decided = {cell for cell, state in labels.items() if state is not None and cell not in flagged}
+    return {
+        "seed": entry["seed"],
+        "turn": entry["turn"],
+        "frontier": entry["frontier"],
+        "components": entry["components"],
+        "seconds": seconds,
+        "unsound": sum(1 for cell, state in claims.items() if labels.get(cell, state) is not state),
+        "missed": len(decided - claims.keys()),
+        "unresolved": len(agent.unresolved),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    generating = commands.add_parser("generate", help="append new positions to a corpus file")
+    generating.add_argument("--positions", type=int, default=100)
+    generating.add_argument("--height", type=int, default=16)
+    generating.add_argument("--width", type=int, default=30)
+    generating.add_argument("--probability-mine", type=float, default=0.2)
+    generating.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    generating.add_argument("--per-game", type=int, default=PER_GAME, help="most positions kept from one game")
+    generating.add_argument("--min-undetermined", type=int, default=MIN_UNDETERMINED,
+                            help="fewest undetermined frontier cells in a kept position")
+    generating.add_argument("--output", required=True, help="corpus file to append to")
+    checking = commands.add_parser("check", help="solve every position and compare with its labels")
+    checking.add_argument("corpus", nargs="+", help="corpus files, in order")
+    checking.add_argument("--move-budget", type=float, default=None, help="seconds of inference per position")
+    checking.add_argument("--processes", type=int, default=1, help="worker processes for each agent's queries")
+    checking.add_argument("--output", default="-", help="JSONL results, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        entries = generate(
+            args.positions, args.height, args.width, args.probability_mine, args.seed, args.per_game,
+            args.min_undetermined
+        )
+        with open(args.output, "a") as output:
+            written = record.append(entries, output)
+        print(json.dumps({"positions": written}), file=sys.stderr)
+        return 0
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    checked = unsound = missed = 0
+    seconds = 0.0
+    try:
+        for path in args.corpus:
+            for entry in record.read(path):
+                result = check(entry, args.move_budget, processes=args.processes)
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                checked += 1
+                unsound += result["unsound"]
+                missed += result["missed"]
+                seconds += result["seconds"]
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps({
+        "positions": checked,
+        "unsound": unsound,
+        "missed": missed,
+        "solver_seconds": seconds,
+        "positions_per_second": checked / seconds if seconds else 0.0,
+    }), file=sys.stderr)
+    return 1 if unsound else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,2 +1,7 @@
 from .proposition import *
-from .connective import *
\ No newline at end of file
+from .connective import *
+from .sat import *
+from .base import *
+from .compiler import *
+from .vectorized import *
+from .simplifier import *
\ No newline at end of file
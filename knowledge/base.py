@@ -0,0 +1,318 @@
+import contextlib
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator
+
+from . import connective, proposition, sat, simplifier, stats
+
+CACHE_SIZE = 4096
+
+
+class KnowledgeBase(connective.And):
+    """A conjunction that keeps a union-find index of operands sharing propositions.
+
+    Operands with no proposition in common never constrain each other, so every
+    query is answered against the component of the queried propositions only.
+    Components are merged as operands link them, and each keeps a cached
+    `sat.Prover` until it changes. Queries may run from several threads at
+    once; they take a lock around the cached provers, which are stateful.
+    Adding or removing operands must not overlap with queries.
+
+    Answers are memoised in an LRU cache of `cache_size` entries keyed by the
+    versions of the components involved, so a query costs a lookup until an
+    operand touching its component is added or removed. With a `stats.Stats`,
+    cache hits and misses, provers built and the solver's work are counted.
+    """
+
+    def __init__(self,
+                 *operands: 'proposition.Proposition | connective.Connective',
+                 cache_size: int = CACHE_SIZE,
+                 stats: 'stats.Stats | None' = None):
+        super().__init__(*operands)
+        self._lock = threading.RLock()
+        self._version = itertools.count()
+        self.cache_size = cache_size
+        self.stats = stats
+        self.reindex()
+
+    def reindex(self) -> None:
+        self._parents: dict[proposition.Proposition, proposition.Proposition] = {}
+        self._members: dict[proposition.Proposition | None, list[proposition.Proposition]] = {None: []}
+        self._operands: dict[proposition.Proposition | None, list[proposition.Proposition | connective.Connective]] = {
+            None: []
+        }
+        self._provers: dict[proposition.Proposition | None, sat.Prover] = {}
+        self._versions: dict[proposition.Proposition | None, int] = {None: next(self._version)}
+        self._cache: OrderedDict[tuple, bool] = OrderedDict()
+        for operand in self.operands:
+            self._index(operand)
+
+    def add(self, operand: 'proposition.Proposition | connective.Connective'):
+        super().add(operand)
+        self._index(operand)
+
+    def _index(self, operand: 'proposition.Proposition | connective.Connective') -> None:
+        root = None
+        for p in self._variables(operand):
+            root = p if root is None else self._union(root, p)
+        root = self.find(root)
+        self._operands[root].append(operand)
+        self._invalidate(root)
+
+    def _invalidate(self, root: proposition.Proposition | None) -> None:
+        # A new version makes every cached answer about the component unreachable.
+        self._versions[root] = next(self._version)
+        if root is None:
+            self._provers.clear()
+        else:
+            self._provers.pop(root, None)
+
+    def remove(self, operand: 'proposition.Proposition | connective.Connective'):
+        """Remove an operand.
+
+        Union-find cannot split, so the component stays merged even if the
+        operand was its only link; `reindex` recomputes the partition.
+        """
+        super().remove(operand)
+        variables = self._variables(operand)
+        root = self.find(next(iter(variables))) if variables else None
+        operands = self._operands[root]
+        for i, existing in enumerate(operands):
+            if existing is operand:
+                del operands[i]
+                break
+        self._invalidate(root)
+
+    def simplify(self,
+                 model: dict[proposition.Proposition, bool] | None = None,
+                 propositions: set[proposition.Proposition] | None = None) -> 'KnowledgeBase':
+        """Simplify the operands in place with `simplifier.conjuncts` and return self.
+
+        Facts in `model` are substituted and then dropped, so the caller must
+        keep passing them to later queries. With `propositions`, only the
+        components containing them are rewritten and re-partitioned. Every
+        other component, and every one whose operands come back unchanged,
+        keeps its version, cached answers and prover.
+        """
+        if propositions is None:
+            self.operands = simplifier.conjuncts(self.operands, model)
+            self.reindex()
+            return self
+
+        roots = {self.find(p) for p in propositions if p in self._parents}
+        rewritten = {}
+        for root in roots:
+            operands = self._operands[root]
+            simplified = simplifier.conjuncts(operands, model)
+            if len(simplified) != len(operands) or any(a is not b for a, b in zip(simplified, operands)):
+                rewritten[root] = simplified
+
+        removed = {id(operand) for root in rewritten for operand in self._operands[root]}
+        for root in rewritten:
+            for p in self._members.pop(root):
+                del self._parents[p]
+            del self._operands[root]
+            del self._versions[root]
+            self._provers.pop(root, None)
+        self.operands = [operand for operand in self.operands if id(operand) not in removed]
+        for simplified in rewritten.values():
+            for operand in simplified:
+                self.add(operand)
+        return self
+
+    def find(self, p: proposition.Proposition | None) -> proposition.Proposition | None:
+        if p is None:
+            return None
+        if p not in self._parents:
+            self._parents[p] = p
+            self._members[p] = [p]
+            self._operands[p] = []
+            self._versions[p] = next(self._version)
+        while self._parents[p] is not p:
+            self._parents[p] = self._parents[self._parents[p]]
+            p = self._parents[p]
+        return p
+
+    def _union(self, p: proposition.Proposition, q: proposition.Proposition) -> proposition.Proposition:
+        p, q = self.find(p), self.find(q)
+        if p is q:
+            return p
+        if len(self._members[p]) < len(self._members[q]):
+            p, q = q, p
+        self._parents[q] = p
+        self._members[p].extend(self._members.pop(q))
+        self._operands[p].extend(self._operands.pop(q))
+        del self._versions[q]
+        self._invalidate(p)
+        self._provers.pop(q, None)
+        return p
+
+    @staticmethod
+    def _variables(operand: 'proposition.Proposition | connective.Connective') -> set[proposition.Proposition]:
+        return {
+            p for p in operand.propositions
+            if not isinstance(p, (proposition.Tautology, proposition.Contradiction))
+        }
+
+    def __contains__(self, p: proposition.Proposition) -> bool:
+        return p in self._parents
+
+    def components(self) -> list[list[proposition.Proposition]]:
+        return [members for root, members in self._members.items() if root is not None]
+
+    def component(self, p: proposition.Proposition) -> list['proposition.Proposition | connective.Connective']:
+        """Operands that can influence `p`, including those without propositions."""
+        if p not in self._parents:
+            return list(self._operands[None])
+        return self._operands[self.find(p)] + self._operands[None]
+
+    def members(self, p: proposition.Proposition) -> list[proposition.Proposition]:
+        if p not in self._parents:
+            return [p]
+        return self._members[self.find(p)]
+
+    def version(self, p: proposition.Proposition) -> tuple[int, int]:
+        """A key that changes whenever an operand that can influence `p` is added, removed or rewritten."""
+        root = self.find(p) if p in self._parents else None
+        return self._versions[root], self._versions[None]
+
+    def prover(self, p: proposition.Proposition | None) -> sat.Prover:
+        with self._lock:
+            root = self.find(p) if p in self._parents else None
+            if root not in self._provers:
+                operands = self._operands[root] + (self._operands[None] if root is not None else [])
+                self._provers[root] = sat.Prover(connective.And(*operands))
+                if self.stats is not None:
+                    self.stats.count("provers.built")
+            return self._provers[root]
+
+    def entails(self,
+                query: 'proposition.Proposition | connective.Connective',
+                model: dict[proposition.Proposition, bool] | None = None,
+                engine: str | None = None) -> proposition.Tautology | proposition.Contradiction:
+        if model is None:
+            model = {}
+
+        engine = engine or self.engine
+        with self._lock:
+            roots = {self.find(p) for p in self._variables(query) if p in self._parents}
+            members = {p for root in roots for p in self._members[root]} | self._variables(query)
+            model = {p: state for p, state in model.items() if p in members}
+            key = (
+                frozenset(self._versions[root] for root in roots | {None}),
+                simplifier.canonical(query),
+                frozenset(model.items()),
+                engine
+            )
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                if self.stats is not None:
+                    self.stats.count("cache.hits")
+                return proposition.Proposition.from_bool(self._cache[key])
+
+            if self.stats is not None:
+                self.stats.count("cache.misses")
+            if engine == connective.SAT and len(roots) <= 1:
+                prover = self.prover(next(iter(roots)) if roots else None)
+                with self._measure(prover.solver):
+                    entailed = prover.entails(query, model)
+            else:
+                operands = [operand for root in roots | {None} for operand in self._operands[root]]
+                entailed = bool(connective.And(*operands).entails(query, model, engine))
+            self._remember(key, entailed)
+        return proposition.Proposition.from_bool(entailed)
+
+    def backbone(self,
+                 propositions: Iterable[proposition.Proposition],
+                 model: dict[proposition.Proposition, bool] | None = None,
+                 deadline: float | None = None) -> dict[proposition.Proposition, bool | None]:
+        """`sat.Prover.backbone` for propositions of one component, answered from the cache where possible."""
+        propositions = list(propositions)
+        with self._lock:
+            settled = self.cached_backbone(propositions, model)
+            missing = [p for p in propositions if p not in settled]
+            if missing:
+                _, members = self._backbone_key(missing, model)
+                prover = self.prover(missing[0])
+                with self._measure(prover.solver):
+                    found = prover.backbone(missing, dict(members), deadline)
+                self.remember_backbone(found, model)
+                settled.update(found)
+        return settled
+
+    def cached_backbone(self,
+                        propositions: Iterable[proposition.Proposition],
+                        model: dict[proposition.Proposition, bool] | None = None
+                        ) -> dict[proposition.Proposition, bool | None]:
+        """The part of `backbone` that the cache can answer; the other propositions are left out."""
+        propositions = list(propositions)
+        with self._lock:
+            key, _ = self._backbone_key(propositions, model)
+            settled = {}
+            for p in propositions:
+                answers = [self._lookup(key(p, state)) for state in (True, False)]
+                if answers[0] is True:
+                    settled[p] = True
+                elif answers[1] is True:
+                    settled[p] = False
+                elif answers == [False, False]:
+                    settled[p] = None
+            if self.stats is not None:
+                self.stats.count("cache.hits", len(settled))
+                self.stats.count("cache.misses", len(propositions) - len(settled))
+        return settled
+
+    def remember_backbone(self,
+                          settled: dict[proposition.Proposition, bool | None],
+                          model: dict[proposition.Proposition, bool] | None = None) -> None:
+        """Cache backbone answers about one component, such as those `sat.backbone` found in another process."""
+        if not settled:
+            return
+        with self._lock:
+            key, _ = self._backbone_key(list(settled), model)
+            for p, state in settled.items():
+                self._remember(key(p, True), state is True)
+                self._remember(key(p, False), state is False)
+
+    def _backbone_key(self,
+                      propositions: list[proposition.Proposition],
+                      model: dict[proposition.Proposition, bool] | None
+                      ) -> tuple[Callable[[proposition.Proposition, bool], tuple], frozenset]:
+        """The cache key of "p is entailed to be state" in the component of `propositions`, and the part of `model` in it."""
+        root = self.find(propositions[0]) if propositions and propositions[0] in self._parents else None
+        members = set(self._members[root]) if root is not None else set(propositions)
+        model = frozenset((p, state) for p, state in (model or {}).items() if p in members)
+        version = frozenset((self._versions[root], self._versions[None]))
+
+        def key(p: proposition.Proposition, state: bool) -> tuple:
+            return version, simplifier.canonical(p if state else connective.Not(p)), model, connective.SAT
+
+        return key, model
+
+    @contextlib.contextmanager
+    def _measure(self, solver: sat.Solver) -> Iterator[None]:
+        """Time the block and count the solver calls, models found and conflicts in it."""
+        if self.stats is None:
+            yield
+            return
+        solves, models, conflicts = solver.solves, solver.models, solver.conflicts
+        with self.stats.phase("solve"):
+            yield
+        self.stats.count("solver.calls", solver.solves - solves)
+        self.stats.count("solver.models", solver.models - models)
+        self.stats.count("solver.conflicts", solver.conflicts - conflicts)
+
+    def _lookup(self, key: tuple) -> bool | None:
+        """The cached answer for `key`, marked as recently used, or None if it is not cached."""
+        entailed = self._cache.get(key)
+        if entailed is not None:
+            self._cache.move_to_end(key)
+        return entailed
+
+    def _remember(self, key: tuple, entailed: bool) -> None:
+        self._cache[key] = entailed
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
@@ -0,0 +1,68 @@
+from typing import Sequence
+
+from . import connective, proposition
+
+
+class Compiled:
+    """A connective compiled into a flat Python expression over integer-indexed variables.
+
+    Calling it with a sequence of booleans (one per entry of `variables`)
+    evaluates the formula without touching `Proposition.state` or allocating
+    any `Tautology`/`Contradiction` objects. A formula nested too deeply for
+    the Python parser is evaluated by the connective itself instead, and
+    `source` is None.
+    """
+
+    def __init__(self,
+                 formula: 'proposition.Proposition | connective.Connective',
+                 variables: Sequence[proposition.Proposition] | None = None):
+        if variables is None:
+            variables = sorted(formula.propositions - {proposition.Tautology(), proposition.Contradiction()})
+        self.variables: list[proposition.Proposition] = list(variables)
+        self.index: dict[proposition.Proposition, int] = {p: i for i, p in enumerate(self.variables)}
+        self.formula = formula
+        try:
+            self.source: str | None = f"lambda v: {self.expression(formula)}"
+            self.function = eval(self.source, {})
+        except (SyntaxError, RecursionError, MemoryError):
+            # CPython's parser rejects expressions nested more than about 200 levels deep.
+            self.source = None
+            self.function = self._interpret
+
+    def expression(self, formula: 'proposition.Proposition | connective.Connective') -> str:
+        if isinstance(formula, proposition.Tautology):
+            return "True"
+        if isinstance(formula, proposition.Contradiction):
+            return "False"
+        if isinstance(formula, proposition.Proposition):
+            return f"v[{self.index[formula]}]"
+        if isinstance(formula, connective.Not):
+            return f"(not {self.expression(formula.operand)})"
+
+        operands = [self.expression(operand) for operand in formula.operands]
+        if isinstance(formula, connective.Exactly):
+            return f"({' + '.join(operands) or '0'} == {formula.count})"
+        if isinstance(formula, connective.And):
+            return f"({' and '.join(operands)})" if operands else "True"
+        if isinstance(formula, connective.Or):
+            return f"({' or '.join(operands)})" if operands else "False"
+        if len(operands) == 1:
+            return operands[0]
+        if isinstance(formula, connective.Imply):
+            # a -> (b -> c) is ~a v ~b v c, which keeps the expression flat.
+            return f"({' or '.join([f'not {operand}' for operand in operands[:-1]] + operands[-1:])})"
+        if isinstance(formula, connective.Xor):
+            return f"(({' + '.join(operands)}) % 2 == 1)"
+        if isinstance(formula, connective.BiConditional):
+            # Folding n operands with <-> is their parity flipped n - 1 times.
+            return f"(({' + '.join(operands)} + {len(operands) - 1}) % 2 == 1)"
+        raise TypeError(f"Cannot compile {type(formula).__name__}")
+
+    def _interpret(self, values: Sequence[bool]) -> bool:
+        return bool(self.formula.evaluate(dict(zip(self.variables, values))))
+
+    def __call__(self, values: Sequence[bool]) -> bool:
+        return self.function(values)
+
+    def evaluate(self, model: dict[proposition.Proposition, bool]) -> bool:
+        return self.function([model[p] for p in self.variables])
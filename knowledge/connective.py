@@ -1,59 +1,189 @@
+import collections
 import functools
 import itertools
-from typing import Self
+import threading
+import weakref
+from typing import AbstractSet, Iterable, Self
 
 import pandas as pd
 
-from . import proposition
+from . import compiler, proposition, sat, simplifier, vectorized
 
 pd.set_option("display.max_columns", None)
 
+SAT = "sat"
+COMPILED = "compiled"
+VECTORIZED = "vectorized"
+TRUTH_TABLE = "truth_table"
+
+# Guards the first computation of a connective's propositions, which links it to its operands.
+_COLLECT_LOCK = threading.RLock()
+
 
 class Connective:
+    """Base of the logical connectives.
+
+    `propositions` and `size` are computed on first access and then kept up to
+    date as operands are added, removed or reassigned, here and in every
+    connective containing this one, so reading them is O(1). Operands must
+    therefore be changed through `add`, `remove` or by assigning `operands`,
+    never by mutating the operand list in place.
+    """
     notation = "?"
+    engine = SAT
+
+    # Until first accessed, propositions are not counted and no operand links back here.
+    _occurrences: collections.Counter | None = None
+    _size = 0
+    _containers: weakref.WeakKeyDictionary | None = None
 
     def add(self, operand: proposition.Proposition | Self):
         raise NotImplementedError
 
-    def evaluate(self) -> 'proposition.Tautology | proposition.Contradiction':
+    def evaluate(self,
+                 model: dict[proposition.Proposition, bool] | None = None
+                 ) -> 'proposition.Tautology | proposition.Contradiction':
+        """Evaluate under `model`, or under each proposition's `state` when no model is given."""
         raise NotImplementedError
 
     def entails(self,
                 query: 'proposition.Proposition | Connective',
-                model: dict[proposition.Proposition, bool] | None = None) -> proposition.Tautology | proposition.Contradiction:
+                model: dict[proposition.Proposition, bool] | None = None,
+                engine: str | None = None) -> proposition.Tautology | proposition.Contradiction:
 
         if model is None:
             model = {}
 
-        for p, state in model.items():
-            p.state = state
+        engine = engine or self.engine
+        if engine == SAT:
+            return proposition.Proposition.from_bool(sat.entails(self, query, model))
+        if engine == COMPILED:
+            return self._entails_compiled(query, model)
+        if engine == VECTORIZED:
+            counterexample = vectorized.Vectorized(And(self, Not(query)))
+            return proposition.Proposition.from_bool(not counterexample.satisfiable(model))
+        if engine != TRUTH_TABLE:
+            raise ValueError(f"Unknown entailment engine {engine!r}")
 
         propositions = list((self.propositions | query.propositions) - model.keys())
-        for model in itertools.product([False, True], repeat=len(propositions)):
-            for p, state in zip(propositions, model):
-                p.state = state
+        for states in itertools.product([False, True], repeat=len(propositions)):
+            assignment = model | dict(zip(propositions, states))
+            if self.evaluate(assignment) and not query.evaluate(assignment):
+                return proposition.Contradiction()
+
+        return proposition.Tautology()
 
-            if self.evaluate() and not query.evaluate():
+    def _entails_compiled(self,
+                          query: 'proposition.Proposition | Connective',
+                          model: dict[proposition.Proposition, bool]) -> proposition.Tautology | proposition.Contradiction:
+        counterexample = And(self, Not(query)).compile()
+        domains = [(model[p],) if p in model else (False, True) for p in counterexample.variables]
+        for values in itertools.product(*domains):
+            if counterexample(values):
                 return proposition.Contradiction()
 
         return proposition.Tautology()
 
+    def compile(self, variables: list[proposition.Proposition] | None = None) -> 'compiler.Compiled':
+        return compiler.Compiled(self, variables)
+
+    def simplify(self,
+                 model: dict[proposition.Proposition, bool] | None = None) -> 'proposition.Proposition | Connective':
+        return simplifier.simplify(self, model)
+
     @property
-    def propositions(self) -> set['proposition.Proposition']:
+    def propositions(self) -> AbstractSet['proposition.Proposition']:
+        """A live read-only view of the non-constant propositions in this formula."""
+        if self._occurrences is None:
+            self._collect()
+        return self._occurrences.keys()
+
+    @property
+    def size(self) -> int:
+        """The number of nodes in this formula, counting a shared sub-formula once per occurrence."""
+        if self._occurrences is None:
+            self._collect()
+        return self._size
+
+    def _children(self) -> Iterable['proposition.Proposition | Connective']:
         raise NotImplementedError
 
-    def truth_table(self, result_col_name: str | None = None) -> pd.DataFrame:
+    def _collect(self) -> None:
+        with _COLLECT_LOCK:
+            if self._occurrences is not None:
+                return
+            occurrences = collections.Counter()
+            size = 1
+            for operand in self._children():
+                occurrences.update(_variables(operand))
+                size += _size(operand)
+                if isinstance(operand, Connective):
+                    operand._contain(self, 1)
+            self._size = size
+            self._occurrences = occurrences
+
+    def _contain(self, container: 'Connective', n: int) -> None:
+        if self._containers is None:
+            self._containers = weakref.WeakKeyDictionary()
+        links = self._containers.get(container, 0) + n
+        if links:
+            self._containers[container] = links
+        else:
+            del self._containers[container]
+
+    def _link(self, operand: 'proposition.Proposition | Connective', n: int) -> None:
+        """Account for `n` more occurrences of `operand` (fewer if negative) once collected."""
+        if self._occurrences is None:
+            return
+        if isinstance(operand, Connective):
+            operand._contain(self, n)
+        self._count(_variables(operand), n, n * _size(operand))
+
+    def _count(self, propositions: Iterable['proposition.Proposition'], n: int, size: int) -> None:
+        added = []
+        removed = []
+        for p in propositions:
+            before = self._occurrences[p]
+            if before + n:
+                self._occurrences[p] = before + n
+            else:
+                del self._occurrences[p]
+            if not before:
+                added.append(p)
+            elif not before + n:
+                removed.append(p)
+        self._size += size
+        if self._containers and (added or removed or size):
+            for container, links in list(self._containers.items()):
+                container._count(added, links, links * size)
+                if removed:
+                    container._count(removed, -links, 0)
+
+    def __getstate__(self):
+        # The links are weak references and are rebuilt on first access after unpickling.
+        state = self.__dict__.copy()
+        for name in ("_occurrences", "_size", "_containers"):
+            state.pop(name, None)
+        return state
+
+    def truth_table(self, result_col_name: str | None = None, engine: str = VECTORIZED) -> pd.DataFrame:
         if result_col_name is None:
             result_col_name = repr(self)
         propositions = list(self.propositions)
         propositions.sort()
+        if engine == VECTORIZED:
+            assignments, results = vectorized.Vectorized(self, propositions).table()
+            table = pd.DataFrame(assignments, columns=propositions)
+            table[result_col_name] = results
+            return table
+
         n = len(propositions)
         table = pd.DataFrame(columns=propositions + [result_col_name])
         for i, states in enumerate(itertools.product([False, True], repeat=n)):
-            for p, state in zip(propositions, states):
-                p.state = state
+            model = dict(zip(propositions, states))
+            for p, state in model.items():
                 table.loc[i, p] = state
-            table.iloc[i, -1] = self.evaluate()
+            table.iloc[i, -1] = self.evaluate(model)
 
         return table
 
@@ -63,19 +193,20 @@ class Connective:
 
 class Unary(Connective):
     def __init__(self, operand: 'proposition.Proposition | Connective'):
-        self.operand = operand
+        self.__operand = operand
 
     @property
-    def propositions(self) -> set['proposition.Proposition']:
-        propositions = set()
-        if isinstance(self.operand, (proposition.Tautology, proposition.Contradiction)):
-            pass
-        elif isinstance(self.operand, proposition.Proposition):
-            propositions.add(self.operand)
-        else:
-            propositions.update(self.operand.propositions)
+    def operand(self) -> 'proposition.Proposition | Connective':
+        return self.__operand
+
+    @operand.setter
+    def operand(self, operand: 'proposition.Proposition | Connective'):
+        self._link(self.__operand, -1)
+        self.__operand = operand
+        self._link(operand, 1)
 
-        return propositions
+    def _children(self) -> Iterable['proposition.Proposition | Connective']:
+        return [self.__operand]
 
     def __repr__(self):
         return f"{type(self).__name__}({self.operand!r})"
@@ -90,33 +221,47 @@ class Unary(Connective):
 class Binary(Connective):
     def __init__(self, *operands: 'proposition.Proposition | Connective'):
         # assert len(operands) >= 2
-        self.operands: list[proposition.Proposition | Connective] = list(operands)
+        self.__operands: list[proposition.Proposition | Connective] = list(operands)
+
+    @property
+    def operands(self) -> list['proposition.Proposition | Connective']:
+        return self.__operands
+
+    @operands.setter
+    def operands(self, operands: Iterable['proposition.Proposition | Connective']):
+        for operand in self.__operands:
+            self._link(operand, -1)
+        self.__operands = list(operands)
+        for operand in self.__operands:
+            self._link(operand, 1)
 
     def add(self, operand: 'proposition.Proposition | Connective'):
-        self.operands.append(operand)
+        self.__operands.append(operand)
+        self._link(operand, 1)
 
-    @property
-    def propositions(self) -> set['proposition.Proposition']:
-        propositions = set()
-        for operand in self.operands:
-            if isinstance(operand, (proposition.Tautology, proposition.Contradiction)):
-                continue
-            if isinstance(operand, proposition.Proposition):
-                propositions.add(operand)
-            else:
-                propositions.update(operand.propositions)
+    def remove(self, operand: 'proposition.Proposition | Connective'):
+        for i, existing in enumerate(self.__operands):
+            if existing is operand:
+                del self.__operands[i]
+                self._link(operand, -1)
+                return
+        raise ValueError(f"{operand!r} is not an operand of {self!r}")
 
-        return propositions
+    def _children(self) -> Iterable['proposition.Proposition | Connective']:
+        return self.__operands
 
     @staticmethod
     def logic(
             operand1: proposition.Proposition | Connective,
-            operand2: proposition.Proposition | Connective
+            operand2: proposition.Proposition | Connective,
+            model: dict[proposition.Proposition, bool] | None = None
     ) -> proposition.Tautology | proposition.Contradiction:
         raise NotImplementedError
 
-    def evaluate(self) -> 'proposition.Tautology | proposition.Contradiction':
-        result = functools.reduce(self.logic, self.operands)
+    def evaluate(self,
+                 model: dict[proposition.Proposition, bool] | None = None
+                 ) -> 'proposition.Tautology | proposition.Contradiction':
+        result = functools.reduce(lambda operand1, operand2: self.logic(operand1, operand2, model), self.operands)
         assert isinstance(result, (proposition.Tautology, proposition.Contradiction))
         return result
 
@@ -134,35 +279,41 @@ class Binary(Connective):
 class Not(Unary):
     notation = "~"
 
-    def evaluate(self: Self | proposition.Proposition) -> proposition.Tautology | proposition.Contradiction:
+    def evaluate(self: Self | proposition.Proposition,
+                 model: dict[proposition.Proposition, bool] | None = None
+                 ) -> proposition.Tautology | proposition.Contradiction:
         if isinstance(self, proposition.Proposition):
-            return self.evaluate()
+            return self.evaluate(model)
         return (
             proposition
             .Proposition
-            .from_bool(not self.operand.evaluate())
+            .from_bool(not self.operand.evaluate(model))
         )
 
 
 class And(Binary):
     notation = "^"
 
-    def evaluate(self) -> 'proposition.Tautology | proposition.Contradiction':
+    def evaluate(self,
+                 model: dict[proposition.Proposition, bool] | None = None
+                 ) -> 'proposition.Tautology | proposition.Contradiction':
         return (
             proposition
             .Proposition
-            .from_bool(all(operand.evaluate() for operand in self.operands))
+            .from_bool(all(operand.evaluate(model) for operand in self.operands))
         )
 
 
 class Or(Binary):
     notation = "v"
 
-    def evaluate(self) -> 'proposition.Tautology | proposition.Contradiction':
+    def evaluate(self,
+                 model: dict[proposition.Proposition, bool] | None = None
+                 ) -> 'proposition.Tautology | proposition.Contradiction':
         return (
             proposition
             .Proposition
-            .from_bool(any(operand.evaluate() for operand in self.operands))
+            .from_bool(any(operand.evaluate(model) for operand in self.operands))
         )
 
 
@@ -172,10 +323,11 @@ class Xor(Binary):
     @staticmethod
     def logic(
             operand1: proposition.Proposition | Connective,
-            operand2: proposition.Proposition | Connective
+            operand2: proposition.Proposition | Connective,
+            model: dict[proposition.Proposition, bool] | None = None
     ) -> proposition.Tautology | proposition.Contradiction:
-        p = operand1.evaluate()
-        q = operand2.evaluate()
+        p = operand1.evaluate(model)
+        q = operand2.evaluate(model)
         return proposition.Proposition.from_bool((not p and q) or (p and not q))
 
 
@@ -185,19 +337,22 @@ class Imply(Binary):
     @staticmethod
     def logic(
             operand1: proposition.Proposition | Connective,
-            operand2: proposition.Tautology | proposition.Contradiction
+            operand2: proposition.Tautology | proposition.Contradiction,
+            model: dict[proposition.Proposition, bool] | None = None
     ) -> proposition.Tautology | proposition.Contradiction:
         return (
             proposition
             .Proposition
-            .from_bool((not operand1.evaluate()) or operand2)
+            .from_bool((not operand1.evaluate(model)) or operand2)
         )
 
-    def evaluate(self) -> 'proposition.Tautology | proposition.Contradiction':
+    def evaluate(self,
+                 model: dict[proposition.Proposition, bool] | None = None
+                 ) -> 'proposition.Tautology | proposition.Contradiction':
         n = len(self.operands)
-        result = proposition.Proposition.from_bool(self.operands[n - 1].evaluate())
+        result = proposition.Proposition.from_bool(self.operands[n - 1].evaluate(model))
         for i in range(n - 2, -1, -1):
-            result = self.logic(self.operands[i], result)
+            result = self.logic(self.operands[i], result, model)
 
         return result
 
@@ -208,13 +363,82 @@ class BiConditional(Binary):
     @staticmethod
     def logic(
             operand1: proposition.Proposition | Connective,
-            operand2: proposition.Proposition | Connective
+            operand2: proposition.Proposition | Connective,
+            model: dict[proposition.Proposition, bool] | None = None
     ) -> proposition.Tautology | proposition.Contradiction:
-        p = operand1.evaluate()
-        q = operand2.evaluate()
+        p = operand1.evaluate(model)
+        q = operand2.evaluate(model)
         return proposition.Proposition.from_bool((p and q) or (not p and not q))
 
 
+class Exactly(Connective):
+    """True when exactly `count` of the operands are true."""
+    notation = "="
+
+    def __init__(self, count: int, *operands: proposition.Proposition):
+        self.count = count
+        self.__operands: list[proposition.Proposition] = list(dict.fromkeys(operands))
+
+    @property
+    def operands(self) -> list[proposition.Proposition]:
+        return self.__operands
+
+    @operands.setter
+    def operands(self, operands: Iterable[proposition.Proposition]):
+        for operand in self.__operands:
+            self._link(operand, -1)
+        self.__operands = list(dict.fromkeys(operands))
+        for operand in self.__operands:
+            self._link(operand, 1)
+
+    def add(self, operand: proposition.Proposition):
+        if operand not in self.__operands:
+            self.__operands.append(operand)
+            self._link(operand, 1)
+
+    def _children(self) -> Iterable['proposition.Proposition | Connective']:
+        return self.__operands
+
+    def evaluate(self,
+                 model: dict[proposition.Proposition, bool] | None = None
+                 ) -> 'proposition.Tautology | proposition.Contradiction':
+        return (
+            proposition
+            .Proposition
+            .from_bool(sum(1 for operand in self.operands if operand.evaluate(model)) == self.count)
+        )
+
+    def issubset(self, other: 'Exactly') -> bool:
+        return self.propositions <= other.propositions
+
+    def __sub__(self, other: 'Exactly') -> 'Exactly':
+        if not other.issubset(self):
+            raise ValueError(f"{other!s} is not a subset of {self!s}")
+        removed = other.propositions
+        return Exactly(
+            self.count - other.count,
+            *(operand for operand in self.operands if operand not in removed)
+        )
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(map(repr, [self.count, *self.operands]))})"
+
+    def __str__(self):
+        return f"{self.notation}{self.count}{{{', '.join(map(str, self.operands))}}}"
+
+
+def _variables(operand: 'proposition.Proposition | Connective') -> AbstractSet['proposition.Proposition']:
+    if isinstance(operand, (proposition.Tautology, proposition.Contradiction)):
+        return set()
+    if isinstance(operand, proposition.Proposition):
+        return {operand}
+    return operand.propositions
+
+
+def _size(operand: 'proposition.Proposition | Connective') -> int:
+    return operand.size if isinstance(operand, Connective) else 1
+
+
 if __name__ == "__main__":
     alice = proposition.Proposition("Alice")
     bob = proposition.Proposition("Bob")
@@ -0,0 +1,195 @@
+import random
+import time
+from typing import Iterable
+
+from . import connective, proposition
+
+EXACT_LIMIT = 32
+
+
+class Counter:
+    """Weighted model counting over `Exactly` constraints and unit literals.
+
+    Every proposition is independently true with probability `prior`, so an
+    assignment satisfying all constraints has weight prior^t * (1 - prior)^f.
+    Small problems are enumerated exactly with depth-first search; larger ones
+    (or ones that run out of time) fall back to sequential importance sampling.
+    `visited` and `samples` count the search nodes and samples used so far.
+    """
+
+    def __init__(self,
+                 operands: Iterable['proposition.Proposition | connective.Connective'],
+                 prior: float,
+                 model: dict[proposition.Proposition, bool] | None = None):
+        assert 0 <= prior <= 1
+        self.prior = prior
+        self.visited = 0
+        self.samples = 0
+        fixed = dict(model or {})
+        constraints = []
+        for operand in operands:
+            if isinstance(operand, connective.Exactly):
+                constraints.append(operand)
+            elif isinstance(operand, connective.Not) and isinstance(operand.operand, proposition.Proposition):
+                fixed[operand.operand] = False
+            elif isinstance(operand, proposition.Proposition):
+                fixed[operand] = True
+            else:
+                raise TypeError(f"Cannot count models of {type(operand).__name__}")
+
+        self.variables: list[proposition.Proposition] = self._order(
+            [[p for p in constraint.operands if p not in fixed] for constraint in constraints]
+        )
+        index = {p: i for i, p in enumerate(self.variables)}
+        self.needs: list[int] = []
+        self.sizes: list[int] = []
+        self.watching: list[list[int]] = [[] for _ in self.variables]
+        for c, constraint in enumerate(constraints):
+            free = [index[p] for p in constraint.operands if p not in fixed]
+            self.needs.append(constraint.count - sum(1 for p in constraint.operands if fixed.get(p)))
+            self.sizes.append(len(free))
+            for i in free:
+                self.watching[i].append(c)
+
+    @staticmethod
+    def _order(groups: list[list[proposition.Proposition]]) -> list[proposition.Proposition]:
+        """Order variables breadth-first through shared constraints so search prunes early."""
+        ordered = {}
+        by_variable: dict[proposition.Proposition, list[int]] = {}
+        for g, group in enumerate(groups):
+            for p in group:
+                by_variable.setdefault(p, []).append(g)
+        for start in sorted(by_variable):
+            if start in ordered:
+                continue
+            queue = [start]
+            ordered[start] = None
+            for p in queue:
+                for g in by_variable[p]:
+                    for q in groups[g]:
+                        if q not in ordered:
+                            ordered[q] = None
+                            queue.append(q)
+        return list(ordered)
+
+    def marginals(self,
+                  deadline: float | None = None,
+                  rng: random.Random | None = None,
+                  exact_limit: int = EXACT_LIMIT) -> dict[proposition.Proposition, float]:
+        """Return the probability that each variable is true given the constraints."""
+        if not self.variables:
+            if any(need != 0 for need in self.needs):
+                raise ValueError("Constraints are unsatisfiable")
+            return {}
+
+        if len(self.variables) <= exact_limit:
+            try:
+                totals, total = self._exact(deadline)
+            except TimeoutError:
+                pass
+            else:
+                return self._normalise(totals, total)
+
+        totals, total = self._sample(deadline, rng or random.Random(0))
+        return self._normalise(totals, total)
+
+    def _normalise(self, totals: list[float], total: float) -> dict[proposition.Proposition, float]:
+        if total == 0:
+            raise ValueError("Constraints are unsatisfiable")
+        return {p: totals[i] / total for i, p in enumerate(self.variables)}
+
+    def _feasible(self, i: int, value: bool, needs: list[int], sizes: list[int]) -> bool:
+        for c in self.watching[i]:
+            need = needs[c] - value
+            if need < 0 or need > sizes[c] - 1:
+                return False
+        return True
+
+    def _set(self, i: int, value: bool, needs: list[int], sizes: list[int], sign: int = 1) -> None:
+        for c in self.watching[i]:
+            needs[c] -= sign * value
+            sizes[c] -= sign
+
+    def _exact(self, deadline: float | None) -> tuple[list[float], float]:
+        n = len(self.variables)
+        needs = list(self.needs)
+        sizes = list(self.sizes)
+        totals = [0.0] * n
+        if any(need < 0 or need > size for need, size in zip(needs, sizes)):
+            return totals, 0.0
+
+        weights = (1 - self.prior, self.prior)
+        values = [False] * n
+        total = 0.0
+        visited = 0
+
+        def search(i: int, weight: float) -> None:
+            nonlocal total, visited
+            visited += 1
+            if deadline is not None and visited % 1024 == 0 and time.monotonic() > deadline:
+                raise TimeoutError
+            if i == n:
+                total += weight
+                for j in range(n):
+                    if values[j]:
+                        totals[j] += weight
+                return
+
+            for value in (True, False):
+                if self._feasible(i, value, needs, sizes):
+                    values[i] = value
+                    self._set(i, value, needs, sizes)
+                    search(i + 1, weight * weights[value])
+                    self._set(i, value, needs, sizes, -1)
+
+        try:
+            search(0, 1.0)
+        finally:
+            self.visited += visited
+        return totals, total
+
+    def _sample(self, deadline: float | None, rng: random.Random, minimum: int = 64) -> tuple[list[float], float]:
+        """Sequential importance sampling.
+
+        Variables are assigned in order, each drawn from the prior restricted to
+        the values that keep every constraint locally satisfiable; the product
+        of the restricted normalisers is the importance weight of the sample.
+        """
+        n = len(self.variables)
+        totals = [0.0] * n
+        total = 0.0
+        samples = 0
+        while samples < minimum or deadline is None or time.monotonic() < deadline:
+            samples += 1
+            needs = list(self.needs)
+            sizes = list(self.sizes)
+            values = [False] * n
+            weight = 1.0
+            for i in range(n):
+                p_true = self.prior if self._feasible(i, True, needs, sizes) else 0.0
+                p_false = 1 - self.prior if self._feasible(i, False, needs, sizes) else 0.0
+                normaliser = p_true + p_false
+                if normaliser == 0:
+                    weight = 0.0
+                    break
+                values[i] = rng.random() * normaliser < p_true
+                weight *= normaliser
+                self._set(i, values[i], needs, sizes)
+
+            if weight and all(need == 0 for need in needs):
+                total += weight
+                for i in range(n):
+                    if values[i]:
+                        totals[i] += weight
+            if deadline is None and samples >= minimum:
+                break
+        self.samples += samples
+        return totals, total
+
+
+def marginals(operands: Iterable['proposition.Proposition | connective.Connective'],
+              prior: float,
+              model: dict[proposition.Proposition, bool] | None = None,
+              deadline: float | None = None,
+              rng: random.Random | None = None) -> dict[proposition.Proposition, float]:
+    return Counter(operands, prior, model).marginals(deadline, rng)
@@ -0,0 +1,147 @@
+import collections
+from typing import Iterable, Mapping
+
+from . import connective, proposition
+
+
+def propagate(operands: Iterable['proposition.Proposition | connective.Connective'],
+              model: Mapping[proposition.Proposition, bool] | None = None) -> dict[proposition.Proposition, bool]:
+    """Values forced by local counting rules over `Exactly` constraints and unit literals.
+
+    Constraints are reduced by `model` and by every value found, to a
+    fixpoint: a count of zero makes all cells false and a count equal to the
+    number of cells makes them all true. Two constraints sharing cells are
+    compared pairwise: if one's cells are a subset of the other's, their
+    difference becomes a new constraint, and if the larger count exceeds the
+    smaller by the number of cells only the larger one has, those cells are
+    true and the cells only the smaller one has are false. Other operands are
+    ignored, so the result is sound but not complete.
+
+    Returns only values not already in `model`. Raises ValueError if the
+    constraints contradict each other or `model`.
+    """
+    propagator = _Propagator(model or {})
+    for operand in operands:
+        if isinstance(operand, connective.Exactly):
+            propagator.add(operand.operands, operand.count)
+        elif isinstance(operand, connective.Not) and isinstance(operand.operand, proposition.Proposition):
+            propagator.add([operand.operand], 0)
+        elif isinstance(operand, proposition.Proposition) and not isinstance(
+                operand, (proposition.Tautology, proposition.Contradiction)):
+            propagator.add([operand], 1)
+    propagator.run()
+    return propagator.values
+
+
+class _Propagator:
+    def __init__(self, model: Mapping[proposition.Proposition, bool]):
+        self.model = model
+        self.values: dict[proposition.Proposition, bool] = {}
+        self.cells: dict[int, set[proposition.Proposition]] = {}
+        self.counts: dict[int, int] = {}
+        self.keys: dict[frozenset[proposition.Proposition], int] = {}
+        self.watching: dict[proposition.Proposition, set[int]] = collections.defaultdict(set)
+        self.queue: collections.deque[int] = collections.deque()
+        self.ids = 0
+
+    def value(self, p: proposition.Proposition) -> bool | None:
+        value = self.values.get(p)
+        return self.model.get(p) if value is None else value
+
+    def add(self, cells: Iterable[proposition.Proposition], count: int) -> None:
+        unknown = set()
+        for p in cells:
+            value = self.value(p)
+            if value is None:
+                unknown.add(p)
+            else:
+                count -= value
+        if count < 0 or count > len(unknown):
+            raise ValueError(f"No assignment of {len(unknown)} cells has {count} true")
+        if not unknown:
+            return
+
+        key = frozenset(unknown)
+        if key in self.keys:
+            if self.counts[self.keys[key]] != count:
+                raise ValueError("Two constraints on the same cells disagree")
+            return
+        c = self.ids
+        self.ids += 1
+        self.cells[c] = unknown
+        self.counts[c] = count
+        self.keys[key] = c
+        for p in unknown:
+            self.watching[p].add(c)
+        self.queue.append(c)
+
+    def assign(self, p: proposition.Proposition, value: bool) -> None:
+        if p in self.values:
+            if self.values[p] != value:
+                raise ValueError(f"{p} is forced both ways")
+            return
+        self.values[p] = value
+        for c in self.watching.pop(p, ()):
+            cells = self.cells[c]
+            if self.keys.get(frozenset(cells)) == c:
+                del self.keys[frozenset(cells)]
+            cells.discard(p)
+            self.counts[c] -= value
+            key = frozenset(cells)
+            other = self.keys.get(key)
+            if other is not None:
+                # Another constraint already covers these cells; keep one of them.
+                if self.counts[other] != self.counts[c]:
+                    raise ValueError("Two constraints on the same cells disagree")
+                self.retire(c)
+                continue
+            self.keys[key] = c
+            self.queue.append(c)
+
+    def retire(self, c: int) -> None:
+        cells = self.cells.pop(c)
+        del self.counts[c]
+        if self.keys.get(frozenset(cells)) == c:
+            del self.keys[frozenset(cells)]
+        for p in cells:
+            self.watching[p].discard(c)
+
+    def run(self) -> None:
+        while self.queue:
+            c = self.queue.popleft()
+            if c in self.cells:
+                self.settle(c)
+
+    def settle(self, c: int) -> None:
+        cells = self.cells[c]
+        count = self.counts[c]
+        if count < 0 or count > len(cells):
+            raise ValueError(f"No assignment of {len(cells)} cells has {count} true")
+        if count == 0 or count == len(cells):
+            for p in list(cells):
+                self.assign(p, bool(count))
+            if c in self.cells:
+                self.retire(c)
+            return
+
+        others = {d for p in cells for d in self.watching[p]} - {c}
+        for d in sorted(others):
+            if c not in self.cells or d not in self.cells:
+                continue
+            cells, count = self.cells[c], self.counts[c]
+            only_c = cells - self.cells[d]
+            only_d = self.cells[d] - cells
+            if not only_d:
+                self.add(only_c, count - self.counts[d])
+            elif not only_c:
+                self.add(only_d, self.counts[d] - count)
+            elif count - self.counts[d] == len(only_c):
+                self.force(only_c, only_d)
+            elif self.counts[d] - count == len(only_d):
+                self.force(only_d, only_c)
+
+    def force(self, mines: set[proposition.Proposition], safes: set[proposition.Proposition]) -> None:
+        for p in mines:
+            self.assign(p, True)
+        for p in safes:
+            self.assign(p, False)
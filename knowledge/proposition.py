@@ -1,14 +1,21 @@
+import threading
+import weakref
 from typing import Self, Hashable
 
 
 class Proposition:
-    __instances: dict[Hashable, Self] = {}
+    # Interned weakly: a statement keeps one instance while anything refers to it. The instance
+    # carries the `state`, so a state set on a proposition nobody holds is lost when it is collected.
+    __instances: weakref.WeakValueDictionary[Hashable, Self] = weakref.WeakValueDictionary()
+    __lock = threading.Lock()
 
     def __new__(cls, statement):
-        if statement not in cls.__instances:
-            cls.__instances[statement] = super().__new__(cls)
+        with cls.__lock:
+            instance = cls.__instances.get(statement)
+            if instance is None:
+                instance = cls.__instances[statement] = super().__new__(cls)
 
-        return cls.__instances[statement]
+        return instance
 
     def __init__(self, statement: Hashable):
         self._state: Tautology | Contradiction
@@ -37,8 +44,11 @@ class Proposition:
     def propositions(self) -> set[Self]:
         return {self}
 
-    def evaluate(self):
-        return self.state
+    def evaluate(self, model: dict[Self, bool] | None = None):
+        """The value of this proposition in `model`, or its `state` when no model is given."""
+        if model is None:
+            return self.state
+        return self.from_bool(model[self])
 
     def __bool__(self):
         raise TypeError("Proposition can't be converted to bool")
@@ -71,7 +81,7 @@ class Tautology(Proposition):
     def __init__(self):  # NOQA
         self.statement = "T"
 
-    def evaluate(self) -> Self:
+    def evaluate(self, model: dict[Proposition, bool] | None = None) -> Self:
         return self
 
     def __bool__(self):
@@ -90,7 +100,7 @@ class Contradiction(Proposition):
     def __init__(self):  # NOQA
         self.statement = "F"
 
-    def evaluate(self):
+    def evaluate(self, model: dict[Proposition, bool] | None = None) -> Self:
         return self
 
     def __bool__(self):
@@ -0,0 +1,473 @@
+import heapq
+import time
+from typing import Iterable
+
+from . import connective, proposition
+
+
+class CNF:
+    """Tseitin encoding of connective trees into integer clauses.
+
+    Every proposition gets a positive variable, and every compound subformula
+    gets a fresh variable constrained to be equivalent to it, so the literal
+    returned by `encode` can be negated freely (e.g. as a solver assumption).
+    """
+
+    def __init__(self):
+        self.variables: dict[proposition.Proposition, int] = {}
+        self.clauses: list[list[int]] = []
+        self.num_variables = 0
+        self._true: int | None = None
+        self._encoded: dict[int, tuple[object, int]] = {}
+
+    def new_variable(self) -> int:
+        self.num_variables += 1
+        return self.num_variables
+
+    def variable(self, p: proposition.Proposition) -> int:
+        if p not in self.variables:
+            self.variables[p] = self.new_variable()
+        return self.variables[p]
+
+    @property
+    def true(self) -> int:
+        if self._true is None:
+            self._true = self.new_variable()
+            self.clauses.append([self._true])
+        return self._true
+
+    def add(self, formula: 'proposition.Proposition | connective.Connective') -> None:
+        """Assert `formula`, avoiding auxiliary variables where the shape allows it."""
+        if isinstance(formula, connective.And):
+            for operand in formula.operands:
+                self.add(operand)
+        elif isinstance(formula, connective.Or):
+            self.clauses.append([self.encode(operand) for operand in formula.operands])
+        elif isinstance(formula, connective.Imply) and len(formula.operands) == 2:
+            antecedent, consequent = formula.operands
+            self.clauses.append([-self.encode(antecedent), self.encode(consequent)])
+        else:
+            self.clauses.append([self.encode(formula)])
+
+    def encode(self, formula: 'proposition.Proposition | connective.Connective') -> int:
+        if isinstance(formula, proposition.Tautology):
+            return self.true
+        if isinstance(formula, proposition.Contradiction):
+            return -self.true
+        if isinstance(formula, proposition.Proposition):
+            return self.variable(formula)
+
+        key = id(formula)
+        if key in self._encoded:
+            return self._encoded[key][1]
+
+        if isinstance(formula, connective.Not):
+            literal = -self.encode(formula.operand)
+        elif isinstance(formula, connective.And):
+            literal = self.conjunction([self.encode(operand) for operand in formula.operands])
+        elif isinstance(formula, connective.Or):
+            literal = self.disjunction([self.encode(operand) for operand in formula.operands])
+        elif isinstance(formula, connective.Imply):
+            literals = [self.encode(operand) for operand in formula.operands]
+            literal = literals[-1]
+            for antecedent in reversed(literals[:-1]):
+                literal = self.disjunction([-antecedent, literal])
+        elif isinstance(formula, connective.Exactly):
+            literal = self.cardinality([self.encode(operand) for operand in formula.operands], formula.count)
+        elif isinstance(formula, (connective.Xor, connective.BiConditional)):
+            literals = [self.encode(operand) for operand in formula.operands]
+            literal = literals[0]
+            for other in literals[1:]:
+                literal = self.exclusive(literal, other)
+                if isinstance(formula, connective.BiConditional):
+                    literal = -literal
+        else:
+            raise TypeError(f"Cannot encode {type(formula).__name__} into CNF")
+
+        # Keep the formula alive so its id cannot be reused by another object.
+        self._encoded[key] = (formula, literal)
+        return literal
+
+    def cardinality(self, literals: list[int], count: int) -> int:
+        """Sequential counter: at_least[j] holds iff j of the literals seen so far are true."""
+        if not 0 <= count <= len(literals):
+            return -self.true
+        at_least = [self.true] + [-self.true] * (count + 1)
+        for x in literals:
+            for j in range(count + 1, 0, -1):
+                at_least[j] = self.disjunction([at_least[j], self.conjunction([x, at_least[j - 1]])])
+        return self.conjunction([at_least[count], -at_least[count + 1]])
+
+    def conjunction(self, literals: list[int]) -> int:
+        if self._true is not None:
+            if -self._true in literals:
+                return -self._true
+            literals = [literal for literal in literals if literal != self._true]
+        if not literals:
+            return self.true
+        if len(literals) == 1:
+            return literals[0]
+        x = self.new_variable()
+        for literal in literals:
+            self.clauses.append([-x, literal])
+        self.clauses.append([x] + [-literal for literal in literals])
+        return x
+
+    def disjunction(self, literals: list[int]) -> int:
+        return -self.conjunction([-literal for literal in literals])
+
+    def exclusive(self, a: int, b: int) -> int:
+        x = self.new_variable()
+        self.clauses.extend([[-x, a, b], [-x, -a, -b], [x, -a, b], [x, a, -b]])
+        return x
+
+
+class Solver:
+    """CDCL SAT solver with two watched literals, 1UIP learning and VSIDS.
+
+    Clauses may be added between calls to `solve`; learnt clauses are kept, so
+    repeated queries under different assumptions get cheaper over time.
+    """
+
+    def __init__(self, clauses: Iterable[list[int]] = (), num_variables: int = 0):
+        self.num_variables = 0
+        self.values: list[bool | None] = [None]
+        self.levels: list[int] = [0]
+        self.reasons: list[list[int] | None] = [None]
+        self.activity: list[float] = [0.0]
+        self.phase: list[bool] = [False]
+        self.watches: dict[int, list[list[int]]] = {}
+        self.trail: list[int] = []
+        self.trail_limits: list[int] = []
+        self.queue_head = 0
+        self.heap: list[tuple[float, int]] = []
+        self.increment = 1.0
+        self.conflicts = 0
+        self.solves = 0
+        self.models = 0
+        self.consistent = True
+        self.model: dict[int, bool] = {}
+
+        self.grow(num_variables)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def grow(self, num_variables: int) -> None:
+        for v in range(self.num_variables + 1, num_variables + 1):
+            self.values.append(None)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[v] = []
+            self.watches[-v] = []
+            heapq.heappush(self.heap, (0.0, v))
+        self.num_variables = max(self.num_variables, num_variables)
+
+    def value(self, literal: int) -> bool | None:
+        value = self.values[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def add_clause(self, clause: Iterable[int]) -> bool:
+        if not self.consistent:
+            return False
+        self.backtrack(0)
+
+        literals = []
+        for literal in dict.fromkeys(clause):
+            if -literal in literals:
+                return True
+            self.grow(abs(literal))
+            value = self.value(literal)
+            if value is True:
+                return True
+            if value is None:
+                literals.append(literal)
+
+        if not literals:
+            self.consistent = False
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            self.consistent = self.propagate() is None
+        else:
+            self.watches[literals[0]].append(literals)
+            self.watches[literals[1]].append(literals)
+        return self.consistent
+
+    def assign(self, literal: int, reason: list[int] | None) -> None:
+        v = abs(literal)
+        self.values[v] = literal > 0
+        self.levels[v] = len(self.trail_limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self) -> list[int] | None:
+        while self.queue_head < len(self.trail):
+            false_literal = -self.trail[self.queue_head]
+            self.queue_head += 1
+            watchers = self.watches[false_literal]
+            kept = 0
+            i = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.value(first) is True:
+                    watchers[kept] = clause
+                    kept += 1
+                    continue
+
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    watchers[kept] = clause
+                    kept += 1
+                    if self.value(first) is False:
+                        while i < len(watchers):
+                            watchers[kept] = watchers[i]
+                            kept += 1
+                            i += 1
+                        del watchers[kept:]
+                        return clause
+                    self.assign(first, clause)
+            del watchers[kept:]
+        return None
+
+    def analyze(self, conflict: list[int]) -> tuple[list[int], int]:
+        level = len(self.trail_limits)
+        learnt = [0]
+        seen = set()
+        pending = 0
+        literal = 0
+        index = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for q in clause:
+                v = abs(q)
+                if q == literal or v in seen or self.levels[v] == 0:
+                    continue
+                seen.add(v)
+                self.bump(v)
+                if self.levels[v] == level:
+                    pending += 1
+                else:
+                    learnt.append(q)
+
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+
+        learnt[0] = -literal
+        if len(learnt) == 1:
+            return learnt, 0
+
+        deepest = max(range(1, len(learnt)), key=lambda k: self.levels[abs(learnt[k])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def bump(self, v: int) -> None:
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, self.num_variables + 1)
+                         if self.values[u] is None]
+            heapq.heapify(self.heap)
+        elif self.values[v] is None:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def backtrack(self, level: int) -> None:
+        if len(self.trail_limits) <= level:
+            return
+        limit = self.trail_limits[level]
+        for literal in self.trail[limit:]:
+            v = abs(literal)
+            self.phase[v] = literal > 0
+            self.values[v] = None
+            self.reasons[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[limit:]
+        del self.trail_limits[level:]
+        self.queue_head = limit
+
+    def pick(self) -> int | None:
+        while self.heap:
+            activity, v = heapq.heappop(self.heap)
+            if self.values[v] is None and -activity == self.activity[v]:
+                return v if self.phase[v] else -v
+        return None
+
+    def solve(self, assumptions: Iterable[int] = (), deadline: float | None = None) -> bool | None:
+        """Return whether the clauses are satisfiable with every assumption true.
+
+        Returns None if the `time.monotonic()` deadline passes first.
+        """
+        self.solves += 1
+        assumptions = list(assumptions)
+        for literal in assumptions:
+            self.grow(abs(literal))
+        if not self.consistent:
+            return False
+
+        self.backtrack(0)
+        restart_limit = 100
+        conflicts = 0
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    self.conflicts += 1
+                    conflicts += 1
+                    if not self.trail_limits:
+                        self.consistent = False
+                        return False
+                    if deadline is not None and self.conflicts % 64 == 0 and time.monotonic() > deadline:
+                        return None
+                    learnt, level = self.analyze(conflict)
+                    self.backtrack(level)
+                    if len(learnt) == 1:
+                        self.assign(learnt[0], None)
+                    else:
+                        self.watches[learnt[0]].append(learnt)
+                        self.watches[learnt[1]].append(learnt)
+                        self.assign(learnt[0], learnt)
+                    self.increment /= 0.95
+                    continue
+
+                if conflicts >= restart_limit:
+                    conflicts = 0
+                    restart_limit = int(restart_limit * 1.5)
+                    self.backtrack(0)
+                    continue
+
+                level = len(self.trail_limits)
+                if level < len(assumptions):
+                    literal = assumptions[level]
+                    value = self.value(literal)
+                    if value is False:
+                        return False
+                    self.trail_limits.append(len(self.trail))
+                    if value is None:
+                        self.assign(literal, None)
+                    continue
+
+                literal = self.pick()
+                if literal is None:
+                    self.model = {v: bool(self.values[v]) for v in range(1, self.num_variables + 1)}
+                    self.models += 1
+                    return True
+                self.trail_limits.append(len(self.trail))
+                self.assign(literal, None)
+        finally:
+            self.backtrack(0)
+
+    def backbone(self,
+                 literals: list[int],
+                 assumptions: Iterable[int] = (),
+                 deadline: float | None = None) -> dict[int, bool | None]:
+        """Settle each literal under `assumptions`: map it to its entailed value, or None if it can be either.
+
+        Every satisfying assignment found along the way rules out the opposite
+        conclusion for all literals at once, so most literals never need a
+        query of their own. When the `time.monotonic()` deadline passes, the
+        literals already seen both ways are still settled as None and the
+        others are left out.
+        """
+        assumptions = list(assumptions)
+        for literal in literals:
+            self.grow(abs(literal))
+        seen = {True: set(), False: set()}
+        settled = {}
+        expired = False
+        for literal in literals:
+            if expired or deadline is not None and time.monotonic() > deadline:
+                break
+            for state in (True, False):
+                if literal in seen[not state]:
+                    continue
+                satisfiable = self.solve(assumptions + [-literal if state else literal], deadline)
+                if satisfiable is None:
+                    expired = True
+                    break
+                if not satisfiable:
+                    settled[literal] = state
+                    break
+                for other in literals:
+                    seen[self.model[abs(other)] == (other > 0)].add(other)
+            else:
+                settled[literal] = None
+        for literal in seen[True] & seen[False]:
+            settled.setdefault(literal, None)
+        return settled
+
+
+class Prover:
+    """Answers repeated entailment queries against one knowledge base."""
+
+    def __init__(self,
+                 knowledge: 'proposition.Proposition | connective.Connective',
+                 model: dict[proposition.Proposition, bool] | None = None):
+        self.cnf = CNF()
+        self.cnf.add(knowledge)
+        for p, state in (model or {}).items():
+            self.cnf.add(p if state else connective.Not(p))
+        self.solver = Solver(self.cnf.clauses, self.cnf.num_variables)
+        self._loaded = len(self.cnf.clauses)
+
+    def literal(self, query: 'proposition.Proposition | connective.Connective') -> int:
+        literal = self.cnf.encode(query)
+        # A proposition outside every clause still needs a variable in the solver.
+        self.solver.grow(self.cnf.num_variables)
+        for clause in self.cnf.clauses[self._loaded:]:
+            self.solver.add_clause(clause)
+        self._loaded = len(self.cnf.clauses)
+        return literal
+
+    def assumptions(self, model: dict[proposition.Proposition, bool] | None) -> list[int]:
+        return [self.literal(p) if state else -self.literal(p) for p, state in (model or {}).items()]
+
+    def entails(self,
+                query: 'proposition.Proposition | connective.Connective',
+                model: dict[proposition.Proposition, bool] | None = None) -> bool:
+        assumptions = self.assumptions(model)
+        return not self.solver.solve(assumptions + [-self.literal(query)])
+
+    def backbone(self,
+                 propositions: Iterable[proposition.Proposition],
+                 model: dict[proposition.Proposition, bool] | None = None,
+                 deadline: float | None = None) -> dict[proposition.Proposition, bool | None]:
+        """Map each proposition to its entailed value, or None if it can be either.
+
+        Propositions still unsettled at the `time.monotonic()` deadline are left out.
+        """
+        literals = {p: self.literal(p) for p in propositions}
+        settled = self.solver.backbone(list(literals.values()), self.assumptions(model), deadline)
+        return {p: settled[literal] for p, literal in literals.items() if literal in settled}
+
+
+def backbone(clauses: list[list[int]],
+             num_variables: int,
+             literals: list[int],
+             assumptions: list[int] = (),
+             deadline: float | None = None) -> dict[int, bool | None]:
+    """`Solver.backbone` on a fresh solver, for worker processes that receive plain clauses."""
+    return Solver(clauses, num_variables).backbone(literals, assumptions, deadline)
+
+
+def entails(knowledge: 'proposition.Proposition | connective.Connective',
+            query: 'proposition.Proposition | connective.Connective',
+            model: dict[proposition.Proposition, bool] | None = None) -> bool:
+    return Prover(knowledge, model).entails(query)
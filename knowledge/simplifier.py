@@ -0,0 +1,254 @@
+import collections
+from typing import Hashable, Iterable
+
+from . import connective, proposition
+
+Formula = 'proposition.Proposition | connective.Connective'
+Literal = tuple[proposition.Proposition, bool]
+
+
+def simplify(formula: Formula, model: dict[proposition.Proposition, bool] | None = None) -> Formula:
+    """Return `formula` with `model` substituted and its constants folded away.
+
+    The result is equivalent to `formula` under `model`. Nested conjunctions and
+    disjunctions are flattened and their duplicate operands dropped, a clause
+    holding both p and ~p becomes `Tautology`, and sub-formulas that do not
+    change are returned as the same objects.
+    """
+    return _simplify(formula, model or {})
+
+
+def _simplify(formula: Formula, model: dict[proposition.Proposition, bool]) -> Formula:
+    if isinstance(formula, (proposition.Tautology, proposition.Contradiction)):
+        return formula
+    if isinstance(formula, proposition.Proposition):
+        return proposition.Proposition.from_bool(model[formula]) if formula in model else formula
+    if isinstance(formula, connective.Not):
+        operand = _simplify(formula.operand, model)
+        if _constant(operand):
+            return proposition.Proposition.from_bool(not operand)
+        if isinstance(operand, connective.Not):
+            return operand.operand
+        return formula if operand is formula.operand else connective.Not(operand)
+    if isinstance(formula, connective.Exactly):
+        return _exactly(formula, model)
+    if isinstance(formula, (connective.And, connective.Or)):
+        return _junction(formula, model)
+    if isinstance(formula, connective.Imply):
+        return _imply(formula, model)
+    if isinstance(formula, (connective.Xor, connective.BiConditional)):
+        return _parity(formula, model)
+    return formula
+
+
+def _constant(formula: Formula) -> bool:
+    return isinstance(formula, (proposition.Tautology, proposition.Contradiction))
+
+
+def _rebuild(formula: 'connective.Binary', operands: list[Formula]) -> 'connective.Binary':
+    if len(operands) == len(formula.operands) and all(a is b for a, b in zip(operands, formula.operands)):
+        return formula
+    return type(formula)(*operands)
+
+
+def _flatten(formula: Formula, kind: type['connective.Binary']) -> list[Formula]:
+    return formula.operands if isinstance(formula, kind) else [formula]
+
+
+def _exactly(formula: 'connective.Exactly', model: dict[proposition.Proposition, bool]) -> Formula:
+    count = formula.count - sum(1 for p in formula.operands if model.get(p))
+    operands = [p for p in formula.operands if p not in model]
+    if count < 0 or count > len(operands):
+        return proposition.Contradiction()
+    if not operands:
+        return proposition.Tautology()
+    if len(operands) == 1:
+        return operands[0] if count else connective.Not(operands[0])
+    if len(operands) == len(formula.operands):
+        return formula
+    return connective.Exactly(count, *operands)
+
+
+def _junction(formula: 'connective.And | connective.Or', model: dict[proposition.Proposition, bool]) -> Formula:
+    kind = connective.And if isinstance(formula, connective.And) else connective.Or
+    absorbing = proposition.Contradiction() if kind is connective.And else proposition.Tautology()
+    identity = proposition.Tautology() if kind is connective.And else proposition.Contradiction()
+
+    operands = []
+    seen = set()
+    literals = set()
+    for operand in formula.operands:
+        for simplified in _flatten(_simplify(operand, model), kind):
+            if simplified is absorbing:
+                return absorbing
+            if simplified is identity:
+                continue
+            key = canonical(simplified)
+            if key in seen:
+                continue
+            literal = _literal(simplified)
+            if literal is not None:
+                if (literal[0], not literal[1]) in literals:
+                    return absorbing
+                literals.add(literal)
+            seen.add(key)
+            operands.append(simplified)
+
+    if not operands:
+        return identity
+    if len(operands) == 1:
+        return operands[0]
+    return _rebuild(formula, operands)
+
+
+def _imply(formula: 'connective.Imply', model: dict[proposition.Proposition, bool]) -> Formula:
+    # a -> (b -> c) is ~a v ~b v c: a false antecedent or a true consequent decides it.
+    consequent = _simplify(formula.operands[-1], model)
+    if consequent is proposition.Tautology():
+        return consequent
+
+    antecedents = []
+    for antecedent in formula.operands[:-1]:
+        antecedent = _simplify(antecedent, model)
+        if antecedent is proposition.Contradiction():
+            return proposition.Tautology()
+        if antecedent is not proposition.Tautology():
+            antecedents.append(antecedent)
+
+    if not antecedents:
+        return consequent
+    if consequent is proposition.Contradiction():
+        return _simplify(connective.Not(connective.And(*antecedents)), {})
+    return _rebuild(formula, antecedents + [consequent])
+
+
+def _parity(formula: 'connective.Xor | connective.BiConditional', model: dict[proposition.Proposition, bool]) -> Formula:
+    # Xor is the parity of its operands; folding n operands with <-> flips it n - 1 more times.
+    flipped = isinstance(formula, connective.BiConditional) and len(formula.operands) % 2 == 0
+    operands = []
+    for operand in formula.operands:
+        operand = _simplify(operand, model)
+        if _constant(operand):
+            flipped ^= bool(operand)
+        else:
+            operands.append(operand)
+
+    if len(operands) == len(formula.operands):
+        return _rebuild(formula, operands)
+    if not operands:
+        return proposition.Proposition.from_bool(flipped)
+    result = operands[0] if len(operands) == 1 else connective.Xor(*operands)
+    return _simplify(connective.Not(result), {}) if flipped else result
+
+
+def canonical(formula: Formula) -> Hashable:
+    """A hashable key equal for formulas that differ only in operand order or repetition where that is harmless."""
+    if isinstance(formula, proposition.Proposition):
+        return formula
+    if isinstance(formula, connective.Not):
+        return connective.Not, canonical(formula.operand)
+    if isinstance(formula, connective.Exactly):
+        return connective.Exactly, formula.count, frozenset(formula.operands)
+    if isinstance(formula, (connective.And, connective.Or)):
+        return type(formula), frozenset(map(canonical, formula.operands))
+    if isinstance(formula, (connective.Xor, connective.BiConditional)):
+        return type(formula), frozenset(collections.Counter(map(canonical, formula.operands)).items())
+    if isinstance(formula, connective.Binary):
+        return type(formula), tuple(map(canonical, formula.operands))
+    return id(formula)
+
+
+def _literal(formula: Formula) -> Literal | None:
+    if isinstance(formula, proposition.Proposition) and not _constant(formula):
+        return formula, True
+    if isinstance(formula, connective.Not) and isinstance(formula.operand, proposition.Proposition):
+        return formula.operand, False
+    return None
+
+
+def _clause(formula: Formula) -> frozenset[Literal] | None:
+    """The literals of a literal or a disjunction of literals, else None."""
+    literal = _literal(formula)
+    if literal is not None:
+        return frozenset([literal])
+    if isinstance(formula, connective.Or):
+        literals = [_literal(operand) for operand in formula.operands]
+        if all(literal is not None for literal in literals):
+            return frozenset(literals)
+    return None
+
+
+def conjuncts(operands: Iterable[Formula], model: dict[proposition.Proposition, bool] | None = None) -> list[Formula]:
+    """Simplify the operands of a conjunction as a whole.
+
+    Besides simplifying each operand, unit literals are propagated into the
+    others until nothing changes, duplicates are dropped and clauses subsumed
+    by a smaller clause are removed. Facts already in `model` are dropped; the
+    caller is expected to keep them. An unsatisfiable conjunction is returned
+    as `[Contradiction()]` and a valid one as `[]`.
+    """
+    model = dict(model or {})
+    operands = list(operands)
+    while True:
+        units: dict[proposition.Proposition, bool] = {}
+        for literal in map(_literal, operands):
+            if literal is not None and literal[0] not in model:
+                if units.setdefault(*literal) != literal[1]:
+                    return [proposition.Contradiction()]
+
+        simplified = []
+        substitution = model | units
+        for operand in operands:
+            literal = _literal(operand)
+            if literal is not None and literal[0] not in model:
+                # Unit literals are kept, so they must not be substituted into themselves.
+                simplified.append(operand)
+                continue
+            for conjunct in _flatten(_simplify(operand, substitution), connective.And):
+                if conjunct is proposition.Contradiction():
+                    return [conjunct]
+                if conjunct is not proposition.Tautology():
+                    simplified.append(conjunct)
+
+        operands = simplified
+        if all(literal is None or literal[0] in units for literal in map(_literal, operands)):
+            break
+
+    unique = _unique(operands)
+    return [proposition.Contradiction()] if unique is None else _subsume(unique)
+
+
+def _unique(operands: list[Formula]) -> list[Formula] | None:
+    """Drop duplicate operands, or return None if two `Exactly` disagree on the same cells."""
+    seen = set()
+    counts: dict[frozenset[proposition.Proposition], int] = {}
+    unique = []
+    for operand in operands:
+        key = canonical(operand)
+        if key in seen:
+            continue
+        if isinstance(operand, connective.Exactly):
+            if counts.setdefault(frozenset(operand.operands), operand.count) != operand.count:
+                return None
+        seen.add(key)
+        unique.append(operand)
+    return unique
+
+
+def _subsume(operands: list[Formula]) -> list[Formula]:
+    """Drop every clause that contains all the literals of a smaller clause."""
+    clauses = {i: clause for i, operand in enumerate(operands) if (clause := _clause(operand)) is not None}
+    occurrences: dict[Literal, list[frozenset[Literal]]] = collections.defaultdict(list)
+    subsumed = set()
+    for i in sorted(clauses, key=lambda i: len(clauses[i])):
+        clause = clauses[i]
+        hits: collections.Counter[frozenset[Literal]] = collections.Counter()
+        for literal in clause:
+            hits.update(occurrences[literal])
+        if any(hits[kept] == len(kept) for kept in hits):
+            subsumed.add(i)
+            continue
+        for literal in clause:
+            occurrences[literal].append(clause)
+
+    return [operand for i, operand in enumerate(operands) if i not in subsumed]
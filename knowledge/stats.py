@@ -0,0 +1,50 @@
+import collections
+import contextlib
+import time
+from typing import Callable, Iterator
+
+# Reusable no-op context for phases timed while instrumentation is off.
+_UNTIMED = contextlib.nullcontext()
+
+
+class Stats:
+    """Opt-in counters, per-phase wall times and event callbacks for the solver.
+
+    Components that accept a `stats` argument do nothing with it while it is
+    None, so instrumentation costs one `is None` check when disabled. Each
+    callback receives `(event, data)` for every `emit`.
+    """
+
+    def __init__(self, *callbacks: Callable[[str, dict], None]):
+        self.counters: collections.Counter[str] = collections.Counter()
+        self.seconds: collections.Counter[str] = collections.Counter()
+        self.callbacks: list[Callable[[str, dict], None]] = list(callbacks)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the wall time of the block to `seconds[name]` and count the call."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.counters[f"{name}.calls"] += 1
+
+    def emit(self, event: str, **data) -> None:
+        for callback in self.callbacks:
+            callback(event, data)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {"counters": dict(self.counters), "seconds": dict(self.seconds)}
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.seconds.clear()
+
+
+def phase(stats: Stats | None, name: str) -> contextlib.AbstractContextManager:
+    """`stats.phase(name)`, or a shared no-op context when `stats` is None."""
+    return _UNTIMED if stats is None else stats.phase(name)
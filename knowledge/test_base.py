@@ -0,0 +1,37 @@
+"""Tests for the KnowledgeBase's components and entailment cache.
+
+Run from the repository root with `python -m unittest knowledge.test_base`.
+"""
+import random
+import unittest
+
+from knowledge import *
+from knowledge.test_engines import CASES, SEED, VARIABLES, BackboneAssertions, random_constraints
+
+
+class KnowledgeBaseTest(BackboneAssertions, unittest.TestCase):
+    def test_cache_matches_brute_force(self):
+        rng = random.Random(SEED)
+        for case in range(CASES):
+            constraints = random_constraints(rng)
+            knowledge = KnowledgeBase(*constraints, cache_size=rng.choice([2, 64]))
+            for _ in range(3):
+                # Warm the cache with single polarities before reading the backbone through it.
+                p = rng.choice(VARIABLES)
+                knowledge.entails(p if rng.random() < 0.5 else Not(p))
+                if rng.random() < 0.3 and knowledge.operands:
+                    knowledge.remove(rng.choice(knowledge.operands))
+            for component in knowledge.components():
+                formula = And(*knowledge.component(component[0]))
+                self.assert_backbone(knowledge.backbone(component), formula, component, case)
+
+    def test_backbone_after_remove_leaves_unconstrained_members(self):
+        a, b, c = Proposition("a"), Proposition("b"), Proposition("c")
+        link = Exactly(1, b, c)
+        knowledge = KnowledgeBase(Exactly(1, a, b), link)
+        knowledge.remove(link)
+        self.assertEqual(knowledge.backbone(knowledge.members(a)), {a: None, b: None, c: None})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+"""Tests for the compiled evaluator.
+
+Run from the repository root with `python -m unittest knowledge.test_compiler`.
+"""
+import unittest
+
+from knowledge import *
+
+
+class CompilerTest(unittest.TestCase):
+    def test_formula_too_deep_for_the_parser(self):
+        a, b = Proposition("a"), Proposition("b")
+        query = b
+        for _ in range(300):
+            query = Not(query)
+        compiled = query.compile()
+        self.assertIsNone(compiled.source)
+        self.assertTrue(compiled.evaluate({b: True}))
+        knowledge = And(Or(a, b), Not(a))
+        for engine in (SAT, COMPILED, VECTORIZED, TRUTH_TABLE):
+            self.assertIs(knowledge.entails(query, engine=engine), Tautology(), engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Seeded cross-checks of the entailment engines against brute force.
+
+The random formula generators and brute-force helpers here are shared by the
+other test modules of the package.
+
+Run from the repository root with `python -m unittest knowledge.test_engines`.
+"""
+import itertools
+import random
+import unittest
+
+from knowledge import *
+
+SEED = 0
+CASES = 150
+VARIABLES = [Proposition(("v", i)) for i in range(6)]
+ENGINES = [SAT, COMPILED, VECTORIZED, TRUTH_TABLE]
+
+
+def random_formula(rng: random.Random, depth: int):
+    if depth == 0 or rng.random() < 0.25:
+        return rng.choice(VARIABLES)
+    kind = rng.choice([Not, And, Or, Xor, Imply, BiConditional, Exactly])
+    if kind is Not:
+        return Not(random_formula(rng, depth - 1))
+    if kind is Exactly:
+        cells = rng.sample(VARIABLES, rng.randint(1, 4))
+        return Exactly(rng.randint(0, len(cells)), *cells)
+    return kind(*(random_formula(rng, depth - 1) for _ in range(rng.randint(2, 3))))
+
+
+def random_constraints(rng: random.Random) -> list:
+    constraints = []
+    for _ in range(rng.randint(1, 4)):
+        cells = rng.sample(VARIABLES, rng.randint(1, 4))
+        constraints.append(Exactly(rng.randint(0, len(cells)), *cells))
+    return constraints
+
+
+def models(formula) -> list[dict]:
+    """Every assignment of VARIABLES that satisfies `formula`, by enumeration."""
+    assignments = (dict(zip(VARIABLES, values)) for values in itertools.product([False, True], repeat=len(VARIABLES)))
+    return [model for model in assignments if formula.evaluate(model)]
+
+
+def brute_backbone(formula, propositions) -> dict | None:
+    """The entailed value of each proposition, None where it can be either, or None if `formula` is unsatisfiable."""
+    satisfying = models(formula)
+    if not satisfying:
+        return None
+    return {
+        p: satisfying[0][p] if all(model[p] == satisfying[0][p] for model in satisfying) else None
+        for p in propositions
+    }
+
+
+class BackboneAssertions:
+    """Mixin for test cases that compare a backbone with `brute_backbone`."""
+
+    def assert_backbone(self, settled: dict, formula, propositions, case: int) -> None:
+        expected = brute_backbone(formula, propositions)
+        if expected is None:
+            # Both values follow from a contradiction, so any decided answer is right.
+            self.assertTrue(all(state is not None for state in settled.values()), f"case {case}: {formula!s}")
+            self.assertEqual(settled.keys(), set(propositions), f"case {case}: {formula!s}")
+        else:
+            self.assertEqual(settled, expected, f"case {case}: {formula!s}")
+
+
+class EngineCrossCheckTest(unittest.TestCase):
+    """Seeded random formulas answered by every engine and by brute force."""
+
+    def test_engines_agree(self):
+        rng = random.Random(SEED)
+        for case in range(CASES):
+            knowledge = And(random_formula(rng, 3), random_formula(rng, 3))
+            query = random_formula(rng, 2)
+            model = {p: rng.random() < 0.5 for p in rng.sample(VARIABLES, rng.randint(0, 2))}
+            expected = all(
+                query.evaluate(assignment) for assignment in models(knowledge) if model.items() <= assignment.items()
+            )
+            for engine in ENGINES:
+                answer = knowledge.entails(query, model, engine=engine)
+                self.assertIs(bool(answer), expected, f"case {case}, {engine}: {knowledge!s} |= {query!s} under {model}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""Tests for local propagation over counting constraints.
+
+Run from the repository root with `python -m unittest knowledge.test_propagation`.
+"""
+import random
+import unittest
+
+from knowledge import *
+from knowledge.propagation import propagate
+from knowledge.test_engines import CASES, SEED, VARIABLES, models, random_constraints
+
+
+class PropagationTest(unittest.TestCase):
+    def test_sound(self):
+        rng = random.Random(SEED)
+        for case in range(CASES):
+            constraints = random_constraints(rng)
+            satisfying = models(And(*constraints))
+            try:
+                forced = propagate(constraints)
+            except ValueError:
+                self.assertEqual(satisfying, [], f"case {case}: {constraints}")
+                continue
+            for p, state in forced.items():
+                self.assertTrue(all(model[p] == state for model in satisfying), f"case {case}: {constraints}, {p}")
+
+    def test_counting_rules(self):
+        a, b, c, d = VARIABLES[:4]
+        self.assertEqual(propagate([Exactly(1, a, b), Exactly(1, a, b, c)]), {c: False})
+        self.assertEqual(propagate([Exactly(1, a, b, c), Exactly(2, a, b, c, d)]), {d: True})
+        self.assertEqual(propagate([Exactly(2, a, b), Not(c)]), {a: True, b: True, c: False})
+        self.assertEqual(propagate([Exactly(1, a, b)], {a: True}), {b: False})
+
+    def test_contradiction(self):
+        a, b = VARIABLES[:2]
+        with self.assertRaises(ValueError):
+            propagate([Exactly(2, a, b), Exactly(0, a)])
+
+
+if __name__ == "__main__":
+    unittest.main()
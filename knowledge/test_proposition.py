@@ -0,0 +1,34 @@
+"""Tests for weakly interned propositions.
+
+Run from the repository root with `python -m unittest knowledge.test_proposition`.
+"""
+import gc
+import unittest
+import weakref
+
+from knowledge import *
+
+
+class PropositionTest(unittest.TestCase):
+    def test_interned_while_referenced(self):
+        p = Proposition(("interned", 1))
+        self.assertIs(Proposition(("interned", 1)), p)
+        self.assertIsNot(Proposition(("interned", 2)), p)
+
+    def test_state_lives_as_long_as_the_proposition(self):
+        p = Proposition("held")
+        p.state = True
+        gc.collect()
+        self.assertIs(Proposition("held").evaluate(), Tautology())
+
+    def test_state_does_not_keep_the_proposition_alive(self):
+        p = Proposition("unreferenced")
+        p.state = False
+        reference = weakref.ref(p)
+        del p
+        gc.collect()
+        self.assertIsNone(reference())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+"""Tests for the CDCL solver's backbone.
+
+Run from the repository root with `python -m unittest knowledge.test_sat`.
+"""
+import random
+import unittest
+
+from knowledge import *
+from knowledge import sat
+from knowledge.test_engines import CASES, SEED, VARIABLES, BackboneAssertions, random_formula
+
+
+class ProverBackboneTest(BackboneAssertions, unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(SEED)
+        for case in range(CASES):
+            knowledge = And(random_formula(rng, 3), random_formula(rng, 3))
+            self.assert_backbone(sat.Prover(knowledge).backbone(VARIABLES), knowledge, VARIABLES, case)
+
+    def test_proposition_outside_every_clause(self):
+        a, b, loose = Proposition("a"), Proposition("b"), Proposition("loose")
+        settled = sat.Prover(And(Exactly(1, a, b))).backbone([a, loose])
+        self.assertEqual(settled, {a: None, loose: None})
+
+
+if __name__ == "__main__":
+    unittest.main()
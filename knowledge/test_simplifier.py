@@ -0,0 +1,103 @@
+"""Equivalence tests for the simplifier and for simplifying a KnowledgeBase in place.
+
+Run from the repository root with `python -m unittest knowledge.test_simplifier`.
+"""
+import itertools
+import random
+import unittest
+
+from knowledge import *
+from knowledge.stats import Stats
+from knowledge.test_engines import CASES, SEED, VARIABLES, random_constraints, random_formula
+
+
+def assignments(model: dict) -> list[dict]:
+    """Every assignment of VARIABLES that agrees with `model`."""
+    free = [p for p in VARIABLES if p not in model]
+    return [model | dict(zip(free, values)) for values in itertools.product([False, True], repeat=len(free))]
+
+
+def holds(operands: list, assignment: dict) -> bool:
+    return all(bool(operand.evaluate(assignment)) for operand in operands)
+
+
+class ConjunctsTest(unittest.TestCase):
+    """`conjuncts` must keep the conjunction's models among the assignments that agree with the facts."""
+
+    def random_model(self, rng: random.Random) -> dict:
+        return {p: rng.random() < 0.5 for p in rng.sample(VARIABLES, rng.randint(0, 3))}
+
+    def assert_equivalent(self, operands: list, model: dict, case: int) -> None:
+        simplified = conjuncts(operands, model)
+        for assignment in assignments(model):
+            self.assertIs(
+                holds(simplified, assignment), holds(operands, assignment),
+                f"case {case}: {[str(o) for o in operands]} -> {[str(o) for o in simplified]} under {model}"
+            )
+
+    def test_formulas(self):
+        rng = random.Random(SEED)
+        for case in range(CASES):
+            operands = [random_formula(rng, 2) for _ in range(rng.randint(1, 4))]
+            self.assert_equivalent(operands, self.random_model(rng), case)
+
+    def test_constraints_and_units(self):
+        rng = random.Random(SEED)
+        for case in range(CASES):
+            operands = random_constraints(rng)
+            for p in rng.sample(VARIABLES, rng.randint(0, 2)):
+                operands.append(p if rng.random() < 0.5 else Not(p))
+            self.assert_equivalent(operands, self.random_model(rng), case)
+
+    def test_drops_facts_of_the_model(self):
+        a, b, c = VARIABLES[:3]
+        simplified = conjuncts([Exactly(1, a, b), Or(a, c)], {a: True})
+        self.assertEqual(list(map(canonical, simplified)), [canonical(Not(b))])
+
+    def test_unchanged_operands_are_returned_as_they_are(self):
+        a, b, c, d = VARIABLES[:4]
+        operands = [Exactly(1, a, b), Exactly(2, b, c, d), Or(a, Not(d))]
+        simplified = conjuncts(operands, {VARIABLES[5]: True})
+        self.assertEqual(len(simplified), len(operands))
+        self.assertTrue(all(s is o for s, o in zip(simplified, operands)))
+
+
+class KnowledgeBaseSimplifyTest(unittest.TestCase):
+    def test_components_answer_as_before(self):
+        rng = random.Random(SEED)
+        for case in range(CASES):
+            constraints = random_constraints(rng)
+            model = {p: rng.random() < 0.5 for p in rng.sample(VARIABLES, rng.randint(1, 3))}
+            satisfying = [assignment for assignment in assignments(model) if holds(constraints, assignment)]
+            if not satisfying:
+                # Queries only see their own component, so a contradiction elsewhere is not entailed.
+                continue
+            knowledge = KnowledgeBase(*constraints)
+            knowledge.simplify(model, set(model))
+            for p in VARIABLES:
+                if p in model:
+                    continue
+                for query in (p, Not(p)):
+                    expected = all(bool(query.evaluate(assignment)) for assignment in satisfying)
+                    self.assertIs(bool(knowledge.entails(query, model)), expected, f"case {case}: {query!s}")
+
+    def test_unchanged_component_keeps_prover_and_cache(self):
+        a, b, c, d = VARIABLES[:4]
+        stats = Stats()
+        knowledge = KnowledgeBase(Exactly(1, a, b), Exactly(1, c, d), stats=stats)
+        prover = knowledge.prover(a)
+        knowledge.backbone([a, b])
+        stats.reset()
+
+        # Only the component of c holds a fact, so the component of a is left as it is.
+        knowledge.simplify({c: True}, {a, c})
+        self.assertIs(knowledge.prover(a), prover)
+        self.assertEqual(knowledge.backbone([a, b]), {a: None, b: None})
+        self.assertEqual(stats.counters["cache.hits"], 2)
+        self.assertEqual(stats.counters["cache.misses"], 0)
+        self.assertNotIn(c, knowledge)
+        self.assertEqual(knowledge.backbone([d], {c: True}), {d: False})
+
+
+if __name__ == "__main__":
+    unittest.main()
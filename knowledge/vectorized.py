@@ -0,0 +1,126 @@
+import functools
+import operator
+from typing import Iterator, Sequence
+
+import numpy as np
+
+from . import connective, proposition
+
+WORD_BITS = 64
+BLOCK_WORDS = 1024
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+ZEROS = np.uint64(0)
+# Bit b of PATTERNS[i] is bit i of b, i.e. the value of variable i in model b of a word.
+PATTERNS = [
+    np.uint64(sum(1 << b for b in range(WORD_BITS) if b >> i & 1))
+    for i in range(6)
+]
+
+
+class Vectorized:
+    """Evaluates a connective over many assignments at once with bitwise NumPy operations.
+
+    Each variable is a `uint64` column in which bit b of word w holds its value
+    in model 64 * w + b, so `And`/`Or`/`Not` handle 64 models per machine word.
+    """
+
+    def __init__(self,
+                 formula: 'proposition.Proposition | connective.Connective',
+                 variables: Sequence[proposition.Proposition] | None = None):
+        if variables is None:
+            variables = sorted(formula.propositions - {proposition.Tautology(), proposition.Contradiction()})
+        self.formula = formula
+        self.variables: list[proposition.Proposition] = list(variables)
+        self.index: dict[proposition.Proposition, int] = {p: i for i, p in enumerate(self.variables)}
+
+    def evaluate(self, columns: Sequence[np.ndarray]) -> np.ndarray:
+        """Evaluate over `columns`, one `uint64` array per entry of `variables`."""
+        shape = np.broadcast_shapes(*(np.shape(column) for column in columns)) if columns else (1,)
+        return np.broadcast_to(self._evaluate(self.formula, columns), shape)
+
+    def _evaluate(self,
+                  formula: 'proposition.Proposition | connective.Connective',
+                  columns: Sequence[np.ndarray]) -> np.ndarray | np.uint64:
+        if isinstance(formula, proposition.Tautology):
+            return ONES
+        if isinstance(formula, proposition.Contradiction):
+            return ZEROS
+        if isinstance(formula, proposition.Proposition):
+            return columns[self.index[formula]]
+        if isinstance(formula, connective.Not):
+            return ~self._evaluate(formula.operand, columns)
+
+        operands = [self._evaluate(operand, columns) for operand in formula.operands]
+        if isinstance(formula, connective.Exactly):
+            # exactly[j] marks the models in which j of the operands seen so far are true.
+            exactly = [ONES] + [ZEROS] * formula.count
+            for x in operands:
+                for j in range(formula.count, 0, -1):
+                    exactly[j] = (exactly[j] & ~x) | (exactly[j - 1] & x)
+                exactly[0] = exactly[0] & ~x
+            return exactly[formula.count] if formula.count >= 0 else ZEROS
+        if isinstance(formula, connective.And):
+            return functools.reduce(operator.and_, operands) if operands else ONES
+        if isinstance(formula, connective.Or):
+            return functools.reduce(operator.or_, operands) if operands else ZEROS
+        if isinstance(formula, connective.Imply):
+            result = operands[-1]
+            for antecedent in reversed(operands[:-1]):
+                result = ~antecedent | result
+            return result
+        if isinstance(formula, (connective.Xor, connective.BiConditional)):
+            result = operands[0]
+            for other in operands[1:]:
+                result = result ^ other
+                if isinstance(formula, connective.BiConditional):
+                    result = ~result
+            return result
+        raise TypeError(f"Cannot vectorize {type(formula).__name__}")
+
+    def blocks(self,
+               model: dict[proposition.Proposition, bool] | None = None,
+               block_words: int = BLOCK_WORDS) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Yield (result, valid) word arrays covering every assignment of the free variables.
+
+        Variables fixed by `model` get constant columns; `valid` masks off the
+        unused bits of the last word when there are fewer than 64 models.
+        """
+        if model is None:
+            model = {}
+        free = [i for i, p in enumerate(self.variables) if p not in model]
+        total_words = max(1, (1 << len(free)) // WORD_BITS)
+        last_mask = ONES if len(free) >= 6 else np.uint64((1 << (1 << len(free))) - 1)
+
+        for start in range(0, total_words, block_words):
+            words = np.arange(start, min(start + block_words, total_words), dtype=np.uint64)
+            columns: list[np.ndarray | np.uint64] = [ZEROS] * len(self.variables)
+            for i, p in enumerate(self.variables):
+                if p in model:
+                    columns[i] = ONES if model[p] else ZEROS
+            for bit, i in enumerate(free):
+                if bit < 6:
+                    columns[i] = PATTERNS[bit]
+                else:
+                    columns[i] = np.where((words >> np.uint64(bit - 6)) & np.uint64(1), ONES, ZEROS)
+
+            result = np.broadcast_to(self._evaluate(self.formula, columns), words.shape)
+            yield result, np.full(words.shape, last_mask)
+
+    def satisfiable(self, model: dict[proposition.Proposition, bool] | None = None) -> bool:
+        return any(np.any(result & valid) for result, valid in self.blocks(model))
+
+    def table(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return (assignments, results) for every model, in `itertools.product` order.
+
+        The first variable is the most significant, so row i of `assignments`
+        matches the i-th tuple of `itertools.product([False, True], repeat=n)`.
+        """
+        n = len(self.variables)
+        reordered = Vectorized(self.formula, self.variables[::-1])
+        results = np.concatenate([result for result, _ in reordered.blocks()])
+        bits = np.unpackbits(results.astype("<u8").view(np.uint8), bitorder="little")[:1 << n].astype(bool)
+        rows = np.arange(1 << n)
+        assignments = np.column_stack([
+            (rows >> (n - 1 - k)) & 1 for k in range(n)
+        ]).astype(bool) if n else np.zeros((1, 0), dtype=bool)
+        return assignments, bits
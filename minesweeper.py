@@ -1,60 +1,175 @@
+import itertools
 import random
-from itertools import combinations
+import time
+from collections import ChainMap
+from collections.abc import Iterable, Iterator, MutableSet
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
 from knowledge import *
+from knowledge import sat
+from knowledge.probability import Counter
+from knowledge.propagation import propagate
+from knowledge.stats import Stats, phase
 
 
 MINE = -1
 
 
+class CellMask(MutableSet):
+    """A set of board cells stored as a boolean array, with an O(1) length."""
+
+    def __init__(self, mask: np.ndarray):
+        self.mask = mask
+        self.count = int(np.count_nonzero(mask))
+
+    def __contains__(self, cell) -> bool:
+        i, j = cell
+        return 0 <= i < self.mask.shape[0] and 0 <= j < self.mask.shape[1] and bool(self.mask[i, j])
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        for i, j in np.argwhere(self.mask):
+            yield int(i), int(j)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @classmethod
+    def _from_iterable(cls, iterable) -> set[tuple[int, int]]:
+        return set(iterable)
+
+    def __eq__(self, other):
+        if isinstance(other, CellMask):
+            return self.count == other.count and bool(np.array_equal(self.mask, other.mask))
+        return super().__eq__(other)
+
+    def add(self, cell: tuple[int, int]) -> None:
+        i, j = cell
+        if not (0 <= i < self.mask.shape[0] and 0 <= j < self.mask.shape[1]):
+            # NumPy would wrap a negative index onto another cell.
+            raise IndexError(f"{cell} is outside the {self.mask.shape[0]}x{self.mask.shape[1]} board")
+        if not self.mask[cell]:
+            self.mask[cell] = True
+            self.count += 1
+
+    def discard(self, cell: tuple[int, int]) -> None:
+        if cell in self:
+            self.mask[cell] = False
+            self.count -= 1
+
+    def __repr__(self):
+        return f"{type(self).__name__}({set(self)!r})"
+
+
 class Minesweeper:
     BOT = "bot"
     HUMAN = "human"
 
-    def __init__(self, height: int, width: int, probability_mine: int | float = 0.25):
+    def __init__(self,
+                 height: int,
+                 width: int,
+                 probability_mine: int | float = 0.25,
+                 compact: bool = False,
+                 mine_count: int | None = None,
+                 rng: random.Random | np.random.Generator | int | None = None,
+                 layout: Iterable[tuple[int, int]] | None = None,
+                 first_click: tuple[int, int] | None = None):
+        """A `layout` of mine cells fixes the board, overriding `probability_mine`, `mine_count` and `rng`.
+
+        Otherwise no mine is placed on `first_click` or its neighbours, so the
+        first reveal there opens a zero region.
+        """
         assert height > 0 and width > 0 and 0 <= probability_mine <= 1
+        assert first_click is None or (0 <= first_click[0] < height and 0 <= first_click[1] < width)
+        self.layout: np.ndarray | None = None
+        if layout is not None:
+            self.layout = np.zeros((height, width), dtype=bool)
+            for i, j in layout:
+                if not (0 <= i < height and 0 <= j < width):
+                    # NumPy would wrap a negative index onto another cell.
+                    raise ValueError(f"Layout cell {(i, j)} is outside the {height}x{width} board")
+                self.layout[i, j] = True
+            mine_count = int(np.count_nonzero(self.layout))
         self.height: int = height
         self.width: int = width
-        self.probability_mine: int | float = probability_mine
-        self.board: list[list[int]] = self.setup_board()
+        self.first_click = first_click
+        assert mine_count is None or 0 <= mine_count <= height * width - int(np.count_nonzero(self.__safe_zone()))
+        self.mine_count = mine_count
+        self.probability_mine: int | float = (
+            probability_mine if mine_count is None else mine_count / (height * width)
+        )
+        self.compact = compact
+        self.rng = rng
+        # Built by the first neighbors() call; a compact board works neighbours out arithmetically instead.
+        self.neighbor_offsets: np.ndarray | None = None
+        self.neighbor_indices: np.ndarray | None = None
+        self.board: list[list[int]] | np.ndarray = self.setup_board()
         self.score: int | float = 0
-        self.mines: set[tuple[int, int]] = self.__get_mines()
-        self.safes: set[tuple[int, int]] = self.__get_safes()
-        self.mines_found: set[tuple[int, int]] = set()
-        self.safes_found: set[tuple[int, int]] = set()
-
-    def __get_mines(self) -> set[tuple[int, int]]:
+        self.mines: set[tuple[int, int]] | CellMask = self.__get_mines()
+        self.safes: set[tuple[int, int]] | CellMask = self.__get_safes()
+        self.mines_found: set[tuple[int, int]] | CellMask = self.__empty()
+        self.safes_found: set[tuple[int, int]] | CellMask = self.__empty()
+        # Found cells that are correct, so won() needs no set comparison.
+        self.__flagged_mines = 0
+        self.__revealed_safes = 0
+
+    def __empty(self) -> set[tuple[int, int]] | CellMask:
+        if self.compact:
+            return CellMask(np.zeros((self.height, self.width), dtype=bool))
+        return set()
+
+    def __get_mines(self) -> set[tuple[int, int]] | CellMask:
+        if self.compact:
+            return CellMask(self.board == MINE)
         return {
             (i, j)
-            for i in range(self.height)
-            for j in range(self.width)
-            if self.is_mine((i, j))
+            for i, row in enumerate(self.board)
+            for j, count in enumerate(row)
+            if count == MINE
         }
 
-    def __get_safes(self) -> set[tuple[int, int]]:
+    def __get_safes(self) -> set[tuple[int, int]] | CellMask:
+        if self.compact:
+            return CellMask(self.board != MINE)
         return {
             (i, j)
-            for i in range(self.height)
-            for j in range(self.width)
-            if self.is_safe((i, j))
+            for i, row in enumerate(self.board)
+            for j, count in enumerate(row)
+            if count != MINE
         }
 
+    def __flag(self, cell: tuple[int, int]) -> None:
+        if cell not in self.mines_found:
+            self.mines_found.add(cell)
+            self.__flagged_mines += self.is_mine(cell)
+
+    def __unflag(self, cell: tuple[int, int]) -> None:
+        if cell in self.mines_found:
+            self.mines_found.remove(cell)
+            self.__flagged_mines -= self.is_mine(cell)
+
     def flagging(self, cell: tuple[int, int], player: str = HUMAN) -> None:
+        if not self.is_within_board(cell):
+            return
         if player == Minesweeper.BOT:
-            self.mines_found.add(cell)
+            self.__flag(cell)
             return
 
-        if not self.is_within_board(cell) or cell in self.safes_found:
+        if cell in self.safes_found:
             return
 
         if cell in self.mines_found:
-            self.mines_found.remove(cell)
+            self.__unflag(cell)
         else:
-            self.mines_found.add(cell)
+            self.__flag(cell)
 
     def get_count(self, cell: tuple[int, int]) -> int:
-        return self.board[cell[0]][cell[1]]
+        return int(self.board[cell[0]][cell[1]])
 
     def get_neighbors(self, cell: tuple[int, int]) -> set[tuple[int, int]]:
+        if self.is_within_board(cell):
+            return {divmod(k, self.width) for k in self.neighbors(cell[0] * self.width + cell[1])}
         return {
             (i, j)
             for i in range(cell[0] - 1, cell[0] + 2)
@@ -62,6 +177,35 @@ class Minesweeper:
             if self.is_within_board((i, j)) and (i, j) != cell
         }
 
+    def neighbors(self, index: int) -> list[int]:
+        """Flat indices (i * width + j) of the neighbours of the cell at flat `index`."""
+        if self.compact:
+            i, j = divmod(index, self.width)
+            return [
+                k * self.width + l
+                for k in range(max(i - 1, 0), min(i + 2, self.height))
+                for l in range(max(j - 1, 0), min(j + 2, self.width))
+                if k != i or l != j
+            ]
+        if self.neighbor_offsets is None:
+            self.neighbor_offsets, self.neighbor_indices = self.__neighbor_table()
+        return self.neighbor_indices[self.neighbor_offsets[index]:self.neighbor_offsets[index + 1]].tolist()
+
+    def __neighbor_table(self) -> tuple[np.ndarray, np.ndarray]:
+        """CSR neighbour table: the neighbours of flat cell k are indices[offsets[k]:offsets[k + 1]]."""
+        index = np.arange(self.height * self.width, dtype=np.int32).reshape(self.height, self.width)
+        padded = np.pad(index, 1, constant_values=-1)
+        shifted = np.stack([
+            padded[1 + di:1 + di + self.height, 1 + dj:1 + dj + self.width]
+            for di in (-1, 0, 1)
+            for dj in (-1, 0, 1)
+            if di or dj
+        ], axis=-1).reshape(self.height * self.width, 8)
+        valid = shifted >= 0
+        offsets = np.zeros(self.height * self.width + 1, dtype=np.int64)
+        np.cumsum(valid.sum(axis=1), out=offsets[1:])
+        return offsets, shifted[valid]
+
     def is_flagged(self, cell: tuple[int, int]) -> bool:
         return cell in self.mines_found
 
@@ -77,77 +221,462 @@ class Minesweeper:
     def mark_safe(self, cell: tuple[int, int], player: str = HUMAN) -> None:
         if player == Minesweeper.BOT and cell in self.mines_found:
             self.flagging(cell)
-        if not self.is_within_board(cell) or cell in self.mines_found:
+        if not self.is_within_board(cell) or cell in self.mines_found or cell in self.safes_found:
             return
         self.safes_found.add(cell)
+        self.__revealed_safes += self.is_safe(cell)
 
-    def setup_board(self) -> list[list[int]]:
-        board = [
-            random.choices([MINE, 0], [self.probability_mine, 1 - self.probability_mine], k=self.width)
-            for _ in range(self.height)
-        ]
+    def reveal(self, cell: tuple[int, int], player: str = HUMAN) -> list[tuple[int, int]]:
+        """Reveal `cell` and return every newly revealed cell, in order.
 
-        for i, row in enumerate(board):
-            for j, cell in enumerate(row):
-                if cell == MINE:
+        Revealing a 0 opens its whole zero region and the numbered cells around
+        it, using an explicit stack rather than recursion. Flagged cells are
+        never opened by the cascade.
+        """
+        if not self.is_within_board(cell) or cell in self.safes_found:
+            return []
+        self.mark_safe(cell, player)
+        if cell not in self.safes_found:
+            return []
+
+        revealed = [cell]
+        stack = [cell[0] * self.width + cell[1]] if self.get_count(cell) == 0 else []
+        while stack:
+            for k in self.neighbors(stack.pop()):
+                neighbor = divmod(k, self.width)
+                if neighbor in self.safes_found or neighbor in self.mines_found:
                     continue
-                board[i][j] = sum(1 for ni, nj in self.get_neighbors((i, j)) if board[ni][nj] == MINE)
-
-        return board
+                self.mark_safe(neighbor)
+                revealed.append(neighbor)
+                if self.get_count(neighbor) == 0:
+                    stack.append(k)
+
+        return revealed
+
+    def setup_board(self) -> list[list[int]] | np.ndarray:
+        if self.layout is not None:
+            mines = self.layout
+        elif self.mine_count is None:
+            generator = self.__generator()
+            mines = (generator.random((self.height, self.width)) < self.probability_mine) & ~self.__safe_zone()
+        else:
+            generator = self.__generator()
+            mines = np.zeros(self.height * self.width, dtype=bool)
+            allowed = np.flatnonzero(~self.__safe_zone())
+            mines[generator.choice(allowed, self.mine_count, replace=False)] = True
+            mines = mines.reshape(self.height, self.width)
+
+        # Sum the eight shifted copies of the padded mine grid to count neighbours.
+        padded = np.pad(mines, 1).astype(np.int8)
+        counts = sum(
+            padded[1 + di:1 + di + self.height, 1 + dj:1 + dj + self.width]
+            for di in (-1, 0, 1)
+            for dj in (-1, 0, 1)
+            if di or dj
+        )
+        board = np.where(mines, MINE, counts).astype(np.int8)
+
+        if self.compact:
+            return board
+        return board.tolist()
+
+    def __safe_zone(self) -> np.ndarray:
+        """The cells kept free of mines for `first_click`, as a mask."""
+        zone = np.zeros((self.height, self.width), dtype=bool)
+        if self.layout is None and self.first_click is not None:
+            i, j = self.first_click
+            zone[max(i - 1, 0):i + 2, max(j - 1, 0):j + 2] = True
+        return zone
+
+    def __generator(self) -> np.random.Generator:
+        if isinstance(self.rng, np.random.Generator):
+            return self.rng
+        if isinstance(self.rng, random.Random):
+            return np.random.default_rng(self.rng.getrandbits(64))
+        if self.rng is None:
+            # Draw from the global `random` state so random.seed() still reproduces boards.
+            return np.random.default_rng(random.getrandbits(64))
+        return np.random.default_rng(self.rng)
 
     def won(self) -> bool:
-        return self.mines_found == self.mines and self.safes_found == self.safes
+        return (
+            self.__flagged_mines == len(self.mines_found) == len(self.mines)
+            and self.__revealed_safes == len(self.safes_found) == len(self.safes)
+        )
 
 
 class MinesweeperAI:
-    def __init__(self, height: int, width: int):
-        assert height > 0 and width > 0
+    def __init__(self,
+                 height: int,
+                 width: int,
+                 probability_mine: float = 0.25,
+                 mine_count: int | None = None,
+                 guess_budget: float = 0.05,
+                 processes: int | None = 1,
+                 enough_safes: int | None = None,
+                 stats: Stats | None = None):
+        """With a known `mine_count`, make_move settles every undecided cell
+        once the mines left are none or as many as those cells, and guesses
+        weigh cells no revealed count touches by the mines left for them.
+
+        `processes` other than 1 fans make_move's queries out over a process pool
+        (None uses one worker per CPU). With `enough_safes`, make_move stops
+        querying once it has found that many safe cells; the cells it skipped
+        stay dirty for the next move.
+
+        A `Stats` collects the time spent in each phase (add_knowledge,
+        collect, propagate, backbone, guess), solver and cache counters, and
+        emits a "component" event per solved component and a "move" event
+        per make_move.
+        """
+        assert height > 0 and width > 0 and 0 <= probability_mine <= 1
         self.height = height
         self.width = width
-        self.knowledge: Connective = And()
+        self.probability_mine = probability_mine
+        self.mine_count = mine_count
+        self.guess_budget = guess_budget
+        self.stats = stats
+        self.random = random.Random(0)
+        self.knowledge: KnowledgeBase = KnowledgeBase(stats=stats)
         self.discovered: dict[Proposition, bool] = {}
+        self.proven: dict[Proposition, bool] = {}
+        # Cells still to settle, and cells whose component's operands changed since the last make_move.
+        self.dirty: set[Proposition] = set()
+        self.changed: set[Proposition] = set()
+        # `dirty` grouped by component as the last make_move left it, until something changes.
+        self.groups: list[list[Proposition]] | None = None
+        # Component versions (`KnowledgeBase.version`) that local propagation has already settled.
+        self.propagated: set[tuple[int, int]] = set()
+        self.processes = processes
+        self.enough_safes = enough_safes
+        self.pool: ProcessPoolExecutor | None = None
+        self.unresolved: set[tuple[int, int]] = set()
+
+    def make_move(self, deadline: float | None = None) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
+        """Return the proven mines and safes, settling the dirty components first.
+
+        Local counting rules (`propagation.propagate`) settle what they can
+        before any SAT query, which then only covers the cells left; a
+        component is propagated once per version. With a `time.monotonic()`
+        deadline, propagation stops halfway to it so the SAT queries always
+        get the other half, and cells not settled by then are listed in
+        `unresolved` and stay dirty for the next call. Cells settled as
+        undetermined leave `dirty` until their component changes.
+        """
+        with phase(self.stats, "collect"):
+            self.collect()
+        frontier = self.frontier()
+        with phase(self.stats, "propagate"):
+            cutoff = None if deadline is None else (time.monotonic() + deadline) / 2
+            known = ChainMap(self.proven, self.discovered)
+            propagated = set()
+            for cells in frontier:
+                version = self.knowledge.version(cells[0])
+                if version in self.propagated:
+                    propagated.add(version)
+                    continue
+                if cutoff is not None and time.monotonic() > cutoff:
+                    continue
+                propagated.add(version)
+                operands = self.knowledge.component(cells[0])
+                try:
+                    settled = propagate(operands, known)
+                except ValueError:
+                    # An inconsistent component gets no local conclusions; the backbone query still covers it.
+                    settled = {}
+                self.proven.update(settled)
+                if self.stats is not None:
+                    self.stats.count("propagate.cells", len(settled))
+                    self.stats.emit("component", constraints=len(operands), variables=len(cells))
+            self.propagated = propagated
+        frontier = [cells for cells in ([p for p in cells if p not in self.proven] for cells in frontier) if cells]
+
+        self.dirty = set(itertools.chain.from_iterable(frontier))
+        found = 0
+        with phase(self.stats, "backbone"):
+            backbones = self.backbones(frontier, deadline)
+            for settled in backbones:
+                self.dirty.difference_update(settled)
+                entailed = {p: state for p, state in settled.items() if state is not None}
+                self.proven.update(entailed)
+                found += sum(1 for state in entailed.values() if not state)
+                if self.enough_safes is not None and found >= self.enough_safes:
+                    break
+            backbones.close()
+        if self.mine_count is not None:
+            self.dirty.difference_update(self.__count_mines())
+        self.unresolved = {cell.statement for cell in self.dirty}
+        self.groups = [group for group in ([p for p in cells if p in self.dirty] for cells in frontier) if group]
 
-    def make_move(self) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
         mines = set()
         safes = set()
-        print(self.knowledge)
-        for i in range(self.height):
-            for j in range(self.width):
-                mine = Proposition((i, j))
-                if self.knowledge.entails(mine, self.discovered):
-                    print(f"{i, j} is a mine")
-                    mines.add((i, j))
-                elif self.knowledge.entails(Not(mine), self.discovered):
-                    print(f"{i, j} is a safe")
-                    safes.add((i, j))
-
+        for mine, state in self.proven.items():
+            if state:
+                mines.add(mine.statement)
+            else:
+                safes.add(mine.statement)
+
+        if self.stats is not None:
+            self.stats.count("moves")
+            self.stats.emit("move", mines=len(mines), safes=len(safes), unresolved=len(self.unresolved))
         return mines, safes
 
+    def __count_mines(self) -> list[Proposition]:
+        """Prove every undecided cell if the mines left are none or fill them all, and return the cells proven."""
+        mines = self.mine_count - sum(self.discovered.values()) - sum(self.proven.values())
+        undecided = self.height * self.width - len(self.discovered) - len(self.proven)
+        if not undecided or mines not in (0, undecided):
+            return []
+        cells = [
+            cell for cell in map(Proposition, itertools.product(range(self.height), range(self.width)))
+            if cell not in self.discovered and cell not in self.proven
+        ]
+        self.proven.update(dict.fromkeys(cells, mines > 0))
+        return cells
+
+    def make_guess(self) -> tuple[int, int] | None:
+        """Return the undiscovered cell least likely to be a mine, or None when every cell is known."""
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+        return min(probabilities, key=lambda cell: (probabilities[cell], cell))
+
+    def mine_probabilities(self, deadline: float | None = None) -> dict[tuple[int, int], float]:
+        """Probability of each undiscovered cell being a mine, within `guess_budget` seconds by default."""
+        if deadline is None:
+            deadline = time.monotonic() + self.guess_budget
+        with phase(self.stats, "guess"):
+            return self.__mine_probabilities(deadline)
+
+    def __mine_probabilities(self, deadline: float) -> dict[tuple[int, int], float]:
+        density = self.probability_mine
+        if self.mine_count is not None:
+            mines = self.mine_count - sum(self.discovered.values()) - sum(self.proven.values())
+            undecided = self.height * self.width - len(self.discovered) - len(self.proven)
+            density = min(max(mines / undecided, 0.0), 1.0) if undecided else 0.0
+        probabilities = {
+            (i, j): density
+            for i in range(self.height)
+            for j in range(self.width)
+            if Proposition((i, j)) not in self.discovered
+        }
+        for mine, state in self.proven.items():
+            probabilities[mine.statement] = float(state)
+
+        components = [
+            component for component in self.knowledge.components()
+            if any(cell.statement in probabilities and cell not in self.proven for cell in component)
+        ]
+        for k, component in enumerate(components):
+            share = (deadline - time.monotonic()) / (len(components) - k)
+            counter = Counter(
+                self.knowledge.component(component[0]),
+                density,
+                self.discovered | self.proven
+            )
+            try:
+                marginals = counter.marginals(time.monotonic() + max(share, 0), self.random)
+            except ValueError:
+                continue
+            finally:
+                if self.stats is not None:
+                    self.stats.count("guess.visited", counter.visited)
+                    self.stats.count("guess.samples", counter.samples)
+            for cell, probability in marginals.items():
+                if cell.statement in probabilities:
+                    probabilities[cell.statement] = probability
+
+        if self.mine_count is not None:
+            # Cells outside every constraint share the mines the constrained ones are not expected to hold.
+            constrained = {
+                cell.statement for component in self.knowledge.components() for cell in component
+                if cell not in self.proven
+            }
+            unconstrained = [
+                cell for cell in probabilities if cell not in constrained and Proposition(cell) not in self.proven
+            ]
+            if unconstrained:
+                expected = sum(probabilities[cell] for cell in constrained if cell in probabilities)
+                density = min(max((mines - expected) / len(unconstrained), 0.0), 1.0)
+                probabilities.update(dict.fromkeys(unconstrained, density))
+
+        return probabilities
+
+    def backbones(self,
+                  components: list[list[Proposition]],
+                  deadline: float | None = None) -> Iterator[dict[Proposition, bool | None]]:
+        """Yield the settled cells of each of `components`, always in the same order.
+
+        With a process pool, every component the cache cannot fully answer is
+        one task carrying its clauses, whose answers are cached as if solved
+        here. Closing the iterator early cancels the tasks that have not
+        started. Iteration stops at the deadline.
+        """
+        if self.processes == 1:
+            for component in components:
+                if deadline is not None and time.monotonic() > deadline:
+                    return
+                yield self.knowledge.backbone(component, deadline=deadline)
+            return
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.processes)
+        tasks = []
+        for component in components:
+            settled = self.knowledge.cached_backbone(component)
+            missing = [cell for cell in component if cell not in settled]
+            if not missing:
+                tasks.append((settled, missing, [], None))
+                continue
+            prover = self.knowledge.prover(missing[0])
+            literals = [prover.literal(cell) for cell in missing]
+            future = self.pool.submit(sat.backbone, prover.cnf.clauses, prover.cnf.num_variables, literals, (), deadline)
+            tasks.append((settled, missing, literals, future))
+
+        try:
+            for settled, cells, literals, future in tasks:
+                if future is not None:
+                    try:
+                        found = future.result(None if deadline is None else max(deadline - time.monotonic(), 0))
+                    except TimeoutError:
+                        return
+                    found = {cell: found[literal] for cell, literal in zip(cells, literals) if literal in found}
+                    self.knowledge.remember_backbone(found)
+                    settled.update(found)
+                yield settled
+        finally:
+            for *_, future in tasks:
+                if future is not None:
+                    future.cancel()
+
+    def close(self) -> None:
+        """Shut down the process pool, if make_move started one."""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def collect(self) -> None:
+        """Substitute discovered cells into the dirty components and drop what they resolve.
+
+        Discovered cells leave the knowledge base entirely (`discovered` keeps
+        them), so it only holds constraints over the undiscovered frontier.
+        Every cell of a component whose operands changed since the last call
+        becomes dirty, and only components holding a newly discovered cell
+        are rewritten; the others keep their cached answers and provers.
+        """
+        changed = {cell for cell in self.changed if cell in self.knowledge}
+        self.changed.clear()
+        if changed:
+            self.groups = None
+        for root in {self.knowledge.find(cell) for cell in changed}:
+            self.dirty.update(self.knowledge.members(root))
+        fresh = {cell for cell in changed if cell in self.discovered}
+        if fresh:
+            self.knowledge.simplify(self.discovered, fresh)
+
+    def frontier(self) -> list[list[Proposition]]:
+        """Undecided dirty cells, grouped by knowledge component."""
+        if self.groups is not None:
+            return self.groups
+        components = {}
+        for cell in self.dirty:
+            if cell in self.knowledge and cell not in self.discovered and cell not in self.proven:
+                components.setdefault(self.knowledge.find(cell), []).append(cell)
+
+        return sorted(sorted(cells) for cells in components.values())
+
     def mark_mine(self, cell: tuple[int, int]) -> None:
         mine = Proposition(cell)
-        self.knowledge.add(mine)
         self.discovered[mine] = True
+        self.proven.pop(mine, None)
+        self.changed.add(mine)
 
     def mark_safe(self, cell: tuple[int, int]) -> None:
         mine = Proposition(cell)
-        self.knowledge.add(Not(mine))
         self.discovered[mine] = False
+        self.proven.pop(mine, None)
+        self.changed.add(mine)
+
+    def observe(self,
+                counts: Iterable[tuple[tuple[int, int], int]] = (),
+                mines: Iterable[tuple[int, int]] = (),
+                safes: Iterable[tuple[int, int]] = (),
+                deadline: float | None = None) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
+        """Ingest a batch of facts and run one inference pass over them.
+
+        `counts` holds revealed cells with their numbers; those cells are also
+        marked safe. Every fact is recorded before any constraint is built, so
+        each constraint already excludes the cells discovered in the same batch.
+        `deadline` bounds the inference pass as in `make_move`.
+        """
+        counts = dict(counts)
+        for cell in mines:
+            self.mark_mine(cell)
+        for cell in itertools.chain(safes, counts):
+            self.mark_safe(cell)
+
+        constraints = set()
+        for cell, count in counts.items():
+            neighbors = self.neighbors(cell)
+            key = (frozenset(neighbors), count)
+            if key not in constraints:
+                constraints.add(key)
+                self.add_knowledge(neighbors, count)
+
+        return self.make_move(deadline)
+
+    def neighbors(self, cell: tuple[int, int]) -> set[tuple[int, int]]:
+        return {
+            (i, j)
+            for i in range(max(cell[0] - 1, 0), min(cell[0] + 2, self.height))
+            for j in range(max(cell[1] - 1, 0), min(cell[1] + 2, self.width))
+            if (i, j) != cell
+        }
 
     def add_knowledge(self, cells: set[tuple[int, int]], count: int) -> None:
-        cells: set[Proposition] = {Proposition(cell) for cell in cells}
-        mines_or_safes = Or()
-        for combination in combinations(cells, count):
-            either_mines_or_safes = And()
-            for cell in combination:
-                either_mines_or_safes.add(cell)
-
-            for cell in cells:
-                if cell not in combination:
-                    either_mines_or_safes.add(Not(cell))
-
-            mines_or_safes.add(either_mines_or_safes)
+        with phase(self.stats, "add_knowledge"):
+            cells = [Proposition(cell) for cell in cells]
+            count -= sum(1 for cell in cells if self.discovered.get(cell))
+            pending = [Exactly(count, *(cell for cell in cells if cell not in self.discovered))]
+            while pending:
+                constraint = pending.pop()
+                if not constraint.operands:
+                    if constraint.count != 0:
+                        self.knowledge.add(constraint)
+                    continue
 
-        self.knowledge.add(mines_or_safes)
+                for existing in self.overlapping(constraint):
+                    if existing.issubset(constraint) and constraint.issubset(existing):
+                        if existing.count == constraint.count:
+                            break
+                    elif existing.issubset(constraint):
+                        pending.append(constraint - existing)
+                        break
+                    elif constraint.issubset(existing):
+                        self.remove_constraint(existing)
+                        pending.append(existing - constraint)
+                else:
+                    self.add_constraint(constraint)
+
+    def add_constraint(self, constraint: Exactly) -> None:
+        self.knowledge.add(constraint)
+        self.changed.update(constraint.operands)
+
+    def remove_constraint(self, constraint: Exactly) -> None:
+        self.knowledge.remove(constraint)
+        self.changed.update(constraint.operands)
+
+    def overlapping(self, constraint: Exactly) -> list[Exactly]:
+        """Constraints in the knowledge components that `constraint` touches."""
+        operands = {}
+        for cell in constraint.operands:
+            if cell in self.knowledge:
+                for operand in self.knowledge.component(cell):
+                    operands[id(operand)] = operand
+        return [
+            operand for operand in operands.values()
+            if isinstance(operand, Exactly) and operand.operands
+        ]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+"""Append-only game records and headless replay of them through MinesweeperAI.
+
+Each line of a record file is one game as JSON: its seed, dimensions, mine
+layout packed into base64 bits, and its turns. A turn is the list of moves
+made between two inferences, each `[kind, i, j]` with kind "g" (guess),
+"r" (reveal) or "f" (flag).
+
+Example:
+    python simulate.py --games 1000 --record games.jsonl
+    python record.py games.jsonl --move-budget 0.1 --output replay.jsonl
+"""
+import argparse
+import base64
+import json
+import mmap
+import os
+import sys
+import time
+from typing import Iterable, Iterator, TextIO
+
+import numpy as np
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+VERSION = 1
+GUESS = "g"
+REVEAL = "r"
+FLAG = "f"
+
+
+def pack_cells(height: int, width: int, cells: Iterable[tuple[int, int]]) -> str:
+    """`cells` as a row-major bitmap of the board, packed into base64."""
+    mask = np.zeros((height, width), dtype=bool)
+    for cell in cells:
+        mask[cell] = True
+    return base64.b64encode(np.packbits(mask, axis=None).tobytes()).decode("ascii")
+
+
+def unpack_cells(height: int, width: int, data: str) -> list[tuple[int, int]]:
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(data), dtype=np.uint8), count=height * width)
+    return [(int(i), int(j)) for i, j in np.argwhere(bits.reshape(height, width))]
+
+
+def game_record(game: Minesweeper, seed: int | None, turns: list[list[list]], won: bool) -> dict:
+    return {
+        "version": VERSION,
+        "seed": seed,
+        "height": game.height,
+        "width": game.width,
+        "mines": pack_cells(game.height, game.width, game.mines),
+        "won": won,
+        "turns": turns,
+    }
+
+
+def board(record: dict) -> Minesweeper:
+    """The recorded board, independent of how the seed would be drawn today."""
+    return Minesweeper(
+        record["height"], record["width"], layout=unpack_cells(record["height"], record["width"], record["mines"])
+    )
+
+
+def append(records: Iterable[dict], output: TextIO) -> int:
+    """Write `records` to `output` one per line and return how many were written."""
+    written = 0
+    for record in records:
+        output.write(json.dumps(record, separators=(",", ":")) + "\n")
+        written += 1
+    output.flush()
+    return written
+
+
+def read(path: str | os.PathLike) -> Iterator[dict]:
+    """Yield the records in `path` one at a time from a memory map of the file."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def replay(record: dict, move_budget: float | None = None, **options) -> dict:
+    """Feed the recorded turns to a fresh MinesweeperAI and time each inference.
+
+    The agent sees the same positions whatever it concludes, so runs of
+    different solver versions over one record file are comparable. Every
+    mine or safe the agent claims is checked against the board; `unsound`
+    counts the wrong ones. `options` are passed to MinesweeperAI.
+    """
+    game = board(record)
+    agent = MinesweeperAI(game.height, game.width, game.probability_mine, **options)
+    move_seconds = []
+    unsound = proven = unresolved_moves = 0
+    try:
+        mines, safes = agent.make_move()
+        unsound += _wrong(game, mines, safes)
+        proven += len(mines) + len(safes)
+        for turn in record["turns"]:
+            flagged = []
+            revealed = []
+            exploded = False
+            for kind, i, j in turn:
+                if kind == FLAG:
+                    game.flagging((i, j), Minesweeper.BOT)
+                    flagged.append((i, j))
+                elif game.is_mine((i, j)):
+                    exploded = True
+                    break
+                else:
+                    revealed.extend(game.reveal((i, j), Minesweeper.BOT))
+            if exploded:
+                break
+
+            start = time.perf_counter()
+            deadline = None if move_budget is None else time.monotonic() + move_budget
+            mines, safes = agent.observe(
+                ((cell, game.get_count(cell)) for cell in revealed), mines=flagged, deadline=deadline
+            )
+            move_seconds.append(time.perf_counter() - start)
+            unresolved_moves += bool(agent.unresolved)
+            unsound += _wrong(game, mines, safes)
+            proven += len(mines) + len(safes)
+    finally:
+        agent.close()
+
+    return {
+        "seed": record["seed"],
+        "height": game.height,
+        "width": game.width,
+        "won": record["won"],
+        "moves": len(move_seconds),
+        "proven": proven,
+        "unsound": unsound,
+        "total_seconds": sum(move_seconds),
+        "mean_move_seconds": sum(move_seconds) / len(move_seconds) if move_seconds else 0.0,
+        "max_move_seconds": max(move_seconds, default=0.0),
+        "unresolved_moves": unresolved_moves,
+    }
+
+
+def _wrong(game: Minesweeper, mines: set[tuple[int, int]], safes: set[tuple[int, int]]) -> int:
+    return sum(1 for cell in mines if not game.is_mine(cell)) + sum(1 for cell in safes if not game.is_safe(cell))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("records", nargs="+", help="record files to replay, in order")
+    parser.add_argument("--move-budget", type=float, default=None,
+                        help="seconds of inference per turn (default: unlimited)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes for each agent's queries")
+    parser.add_argument("--output", default="-", help="JSONL replay results, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    games = unsound = 0
+    seconds = 0.0
+    try:
+        for path in args.records:
+            for record in read(path):
+                result = replay(record, args.move_budget, processes=args.processes)
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                games += 1
+                unsound += result["unsound"]
+                seconds += result["total_seconds"]
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps({"games": games, "unsound": unsound, "solver_seconds": seconds}), file=sys.stderr)
+    return 1 if unsound else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,11 @@
 from minesweeper import Minesweeper, MinesweeperAI
+import itertools
 import pygame
+import queue
 import sys
+import threading
+import time
+from typing import Iterable
 
 
 pygame.init()
@@ -8,6 +13,8 @@ pygame.init()
 IS_LEFT_CLICK = 1
 IS_RIGHT_CLICK = 3
 FPS = 60
+AI_SLICE_SECONDS = 0.05  # The AI worker checks for cancellation and reports progress this often
+AI_MAX_SLICE_SECONDS = 1.6  # Slices that settle nothing are doubled up to this, then the worker gives up
 
 PROBABILITY_MINE = 0.25
 # Board dimensions (adjustable)
@@ -33,6 +40,8 @@ AI_MOVE_FONT_COLOR = "cyan"
 AI_MOVE_OUTLINE_COLOR = "cyan"
 AI_MOVE_BUTTON_COLOR = "brown"
 SCORE_FONT_COLOR = "violet"
+THINKING_FONT_COLOR = "grey"
+PROVEN_SAFE_OUTLINE_COLOR = "green"
 WON = ("You won :)", "dark green")
 LOST = ("You lose :(", "red")
 TRIGGERED_MINE_COLOR = "red"
@@ -54,113 +63,136 @@ pygame.display.set_caption("Minesweeper")
 font = pygame.font.Font(None, 36)
 
 
-def detonate(game: Minesweeper, cell: tuple[int, int]):
-    x = LEFT_MARGIN + cell[1] * CELL_SIZE
-    y = TOP_MARGIN + cell[0] * CELL_SIZE
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-        draw_board(TILE_COLOR)
-        draw_numbers(game.board)
-        draw_board(HIDDEN_TILE_COLOR, exclude=game.safes_found)
-        pygame.draw.rect(screen, TRIGGERED_MINE_COLOR, (x, y, CELL_SIZE, CELL_SIZE))
-        pygame.draw.rect(screen, TABLE_BORDER_COLOR, (x, y, CELL_SIZE, CELL_SIZE), 1)
-        draw_mines(game.mines)
-        draw_flags(game.mines_found)
-        draw_right_panel(game.score)
-        display_game_status(LOST)
-        pygame.display.flip()
-
-
-def display_game_status(status: tuple[str, str]):
-    """Displays the game status (e.g., "You won" or "You lose") below the score text in the right panel."""
-    status_surface = font.render(status[0], True, status[1])
-
-    status_x = LEFT_MARGIN + BOARD_WIDTH * CELL_SIZE + 50
-    status_y = (120 + SCREEN_HEIGHT) // 2  # Adjust based on your UI layout (score text is at 120+)
-
-    screen.blit(status_surface, (status_x, status_y))
-
-
-def draw_board(box_color, exclude: set[tuple[int, int]] | None = None):
-    """Draw the Minesweeper board with a left margin."""
-    if exclude is None:
-        exclude = set()
-
-    for row in range(BOARD_HEIGHT):
-        for col in range(BOARD_WIDTH):
-            if (row, col) in exclude:
-                continue
-            x = LEFT_MARGIN + col * CELL_SIZE
-            y = TOP_MARGIN + row * CELL_SIZE
-            pygame.draw.rect(screen, box_color, (x, y, CELL_SIZE, CELL_SIZE))
-            pygame.draw.rect(screen, TABLE_BORDER_COLOR, (x, y, CELL_SIZE, CELL_SIZE), 1)
-
-
-def draw_flags(flags: set[tuple[int, int]]):
-    for flag in flags:
-        draw_image(FLAG_IMAGE, flag)
-
-
-def draw_image(image, cell):
-    """Draws an image in the specified cell on the board."""
-    row, col = cell
-
-    # Calculate cell position
-    x = LEFT_MARGIN + col * CELL_SIZE
-    y = TOP_MARGIN + row * CELL_SIZE
+# Glyphs never change, so they are rendered once and only blitted afterwards.
+NUMBER_GLYPHS = {number: font.render(str(number), True, NUMBER_FONT_COLOR) for number in range(9)}
+AI_MOVE_GLYPH = font.render("AI Move", True, AI_MOVE_FONT_COLOR)
+PANEL_RECT = pygame.Rect(RIGHT_PANEL_X, 0, SCREEN_WIDTH - RIGHT_PANEL_X, SCREEN_HEIGHT)
 
-    # Calculate centered position for the image
-    img_x = x + (CELL_SIZE - image.get_width()) // 2
-    img_y = y + (CELL_SIZE - image.get_height()) // 2
 
-    screen.blit(image, (img_x, img_y))
+class BoardView:
+    """The board kept on a persistent surface; each frame redraws and pushes only the cells that changed.
 
+    Callers `invalidate` the cells they change; `render` redraws those whose
+    appearance differs from what is on screen and updates just their rects.
+    """
 
-def draw_mines(mines: set[tuple[int, int]]) -> None:
-    for mine in mines:
-        draw_image(MINE_IMAGE, mine)
-
-
-def draw_numbers(board: list[list[int]]):
-    """Draws numbers in the center of each cell based on the given board."""
-    for row in range(len(board)):
-        for col in range(len(board[row])):
-            # Calculate cell position
-            x = LEFT_MARGIN + col * CELL_SIZE
-            y = TOP_MARGIN + row * CELL_SIZE
+    def __init__(self, game: Minesweeper):
+        self.game = game
+        self.surface = pygame.Surface((BOARD_WIDTH * CELL_SIZE, BOARD_HEIGHT * CELL_SIZE))
+        self.shown: dict[tuple[int, int], tuple] = {}
+        self.dirty = {(row, col) for row in range(BOARD_HEIGHT) for col in range(BOARD_WIDTH)}
+        self.outlined: set[tuple[int, int]] = set()
+        self.exploded: tuple[int, int] | None = None
+        self.panel: tuple | None = None
+        screen.fill(BACKGROUND_COLOR)
+        pygame.display.flip()
 
-            # Get the number to display
-            number = board[row][col]
+    def invalidate(self, cells: Iterable[tuple[int, int]]) -> None:
+        self.dirty.update(cell for cell in cells if ensure_coordinate(cell))
+
+    def outline(self, cells: set[tuple[int, int]]) -> None:
+        """Outline `cells` (the cells proven safe so far) instead of the previous ones."""
+        self.invalidate(self.outlined ^ cells)
+        self.outlined = cells
+
+    def explode(self, cell: tuple[int, int]) -> None:
+        """Show every mine, with `cell` as the one that went off."""
+        self.exploded = cell
+        self.invalidate(self.game.mines)
+        self.invalidate([cell])
+
+    def state(self, cell: tuple[int, int]) -> tuple:
+        if cell == self.exploded:
+            return "exploded",
+        if cell in self.game.safes_found:
+            return "revealed", self.game.get_count(cell)
+        mine = self.exploded is not None and self.game.is_mine(cell)
+        return "hidden", mine, self.game.is_flagged(cell), cell in self.outlined
+
+    def draw(self, cell: tuple[int, int], state: tuple) -> pygame.Rect:
+        """Draw one cell onto the board surface and copy it to the screen; returns its screen rect."""
+        rect = pygame.Rect(cell[1] * CELL_SIZE, cell[0] * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        kind = state[0]
+        color = {"exploded": TRIGGERED_MINE_COLOR, "revealed": TILE_COLOR}.get(kind, HIDDEN_TILE_COLOR)
+        pygame.draw.rect(self.surface, color, rect)
+        pygame.draw.rect(self.surface, TABLE_BORDER_COLOR, rect, 1)
+        if kind == "revealed":
+            draw_image(self.surface, NUMBER_GLYPHS[state[1]], rect)
+        elif kind == "exploded":
+            draw_image(self.surface, MINE_IMAGE, rect)
+        else:
+            _, mine, flagged, outlined = state
+            if mine:
+                draw_image(self.surface, MINE_IMAGE, rect)
+            if flagged:
+                draw_image(self.surface, FLAG_IMAGE, rect)
+            if outlined:
+                pygame.draw.rect(self.surface, PROVEN_SAFE_OUTLINE_COLOR, rect, 2)
+
+        screen_rect = rect.move(LEFT_MARGIN, TOP_MARGIN)
+        screen.blit(self.surface, screen_rect, area=rect)
+        return screen_rect
+
+    def render(self, status: tuple[str, str] | None = None, unresolved: int = 0, stalled: bool = False) -> None:
+        rects = []
+        for cell in self.dirty:
+            state = self.state(cell)
+            if self.shown.get(cell) != state:
+                self.shown[cell] = state
+                rects.append(self.draw(cell, state))
+        self.dirty.clear()
+
+        panel = (self.game.score, unresolved, status, stalled)
+        if panel != self.panel:
+            self.panel = panel
+            draw_right_panel(*panel)
+            rects.append(PANEL_RECT)
+
+        if rects:
+            pygame.display.update(rects)
+
+
+def detonate(view: BoardView, cell: tuple[int, int]):
+    view.explode(cell)
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
 
-            if number != 0 or True:
-                # Render the number text
-                number_text = font.render(str(number), True, NUMBER_FONT_COLOR)
+        view.render(LOST)
+        clock.tick(FPS)
 
-                # Calculate position to center the text in the cell
-                text_rect = number_text.get_rect(center=(x + CELL_SIZE // 2, y + CELL_SIZE // 2))
 
-                # Draw the text
-                screen.blit(number_text, text_rect)
+def draw_image(surface: pygame.Surface, image: pygame.Surface, rect: pygame.Rect):
+    """Blits an image centered in `rect`."""
+    surface.blit(image, image.get_rect(center=rect.center))
 
 
-def draw_right_panel(score: int | float):
-    """Draw the right panel with the AI Move button and score."""
+def draw_right_panel(score: int | float,
+                     unresolved: int = 0,
+                     status: tuple[str, str] | None = None,
+                     stalled: bool = False):
+    """Draw the right panel with the AI Move button, the score, the AI's progress and the game status."""
+    pygame.draw.rect(screen, BACKGROUND_COLOR, PANEL_RECT)
 
     # Draw AI Move button
     pygame.draw.rect(screen, AI_MOVE_BUTTON_COLOR, button_rect)
     pygame.draw.rect(screen, AI_MOVE_OUTLINE_COLOR, button_rect, 2)
-    button_text = font.render("AI Move", True, AI_MOVE_FONT_COLOR)
-    text_rect = button_text.get_rect(center=button_rect.center)
-    screen.blit(button_text, text_rect)
+    screen.blit(AI_MOVE_GLYPH, AI_MOVE_GLYPH.get_rect(center=button_rect.center))
 
     # Draw Score
     score_text = font.render(f"Score = {score}", True, SCORE_FONT_COLOR)
-    score_rect = score_text.get_rect(topleft=(RIGHT_PANEL_X, 120))
-    screen.blit(score_text, score_rect)
+    screen.blit(score_text, score_text.get_rect(topleft=(RIGHT_PANEL_X, 120)))
+
+    if unresolved:
+        thinking_text = font.render(f"{'Stalled' if stalled else 'Thinking'} ({unresolved})", True, THINKING_FONT_COLOR)
+        screen.blit(thinking_text, thinking_text.get_rect(topleft=(RIGHT_PANEL_X, 160)))
+
+    if status is not None:
+        # Below the score text, which is at 120+
+        status_surface = font.render(status[0], True, status[1])
+        screen.blit(status_surface, (RIGHT_PANEL_X, (120 + SCREEN_HEIGHT) // 2))
 
 
 def ensure_coordinate(cell: tuple[int, int]) -> bool:
@@ -174,27 +206,113 @@ def get_coordinate() -> tuple[int, int]:
     return i // CELL_SIZE, j // CELL_SIZE
 
 
-def victory(game: Minesweeper) -> None:
+def victory(view: BoardView) -> None:
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
 
-        draw_board(TILE_COLOR)
-        draw_numbers(game.board)
-        draw_board(HIDDEN_TILE_COLOR, exclude=game.safes_found)
-        draw_flags(game.mines_found)
-        draw_right_panel(game.score)
-        display_game_status(WON)
-
-        pygame.display.flip()
+        view.render(WON)
         clock.tick(FPS)
 
 
+class Thinker:
+    """Runs the agent on one long-lived background thread so the event loop keeps its frame rate.
+
+    `start` queues a job and returns at once; the UI thread never waits for
+    the worker and never touches the agent. Every `start` or `cancel` bumps a
+    generation counter: the worker ingests the facts of every queued job, but
+    stops thinking as soon as its job is out of date, and `poll` drops reports
+    from older generations. A cancelled job keeps what it proved; the cells it
+    did not settle stay dirty for the next job. A slice that settles nothing
+    is followed by one twice as long; once a slice of AI_MAX_SLICE_SECONDS
+    settles nothing, the job stops thinking, and reports STALLED or, for a
+    move, falls back to a guess if nothing is proven. Jobs report (kind,
+    mines, safes, unresolved) tuples.
+    """
+    THINKING = "thinking"
+    DONE = "done"
+    MOVE = "move"
+    STALLED = "stalled"
+
+    def __init__(self, agent: MinesweeperAI):
+        self.agent = agent
+        self.jobs: queue.Queue[tuple[int, list, list, bool]] = queue.Queue()
+        self.results: queue.Queue[tuple[int, str, set, set, int]] = queue.Queue()
+        self.generation = 0  # Only the UI thread writes it.
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def start(self,
+              counts: Iterable[tuple[tuple[int, int], int]] = (),
+              mines: Iterable[tuple[int, int]] = (),
+              move: bool = False) -> None:
+        """Ingest `counts` and `mines`, think until everything is settled and, with `move`, pick a move."""
+        self.generation += 1
+        self.jobs.put((self.generation, list(counts), list(mines), move))
+
+    def cancel(self) -> None:
+        self.generation += 1
+
+    def work(self) -> None:
+        while True:
+            jobs = [self.jobs.get()]
+            while True:
+                try:
+                    jobs.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self.run(jobs)
+
+    def run(self, jobs: list[tuple[int, list, list, bool]]) -> None:
+        """Ingest the facts of all `jobs` at once and think for the newest of them."""
+        counts = {}
+        mines = []
+        for _, job_counts, job_mines, _ in jobs:
+            counts.update(job_counts)
+            mines.extend(job_mines)
+        generation, _, _, move = jobs[-1]
+
+        seconds = AI_SLICE_SECONDS
+        mines, safes = self.agent.observe(counts.items(), mines=mines, deadline=time.monotonic() + seconds)
+        while self.agent.unresolved and generation == self.generation and seconds <= AI_MAX_SLICE_SECONDS:
+            unresolved = len(self.agent.unresolved)
+            self.results.put((generation, self.THINKING, mines, safes, unresolved))
+            mines, safes = self.agent.make_move(time.monotonic() + seconds)
+            if len(self.agent.unresolved) >= unresolved:
+                seconds *= 2
+        if generation != self.generation:
+            return
+
+        if move:
+            if not mines and not safes and (guess := self.agent.make_guess()) is not None:
+                safes = {guess}
+            self.results.put((generation, self.MOVE, mines, safes, 0))
+        elif self.agent.unresolved:
+            self.results.put((generation, self.STALLED, mines, safes, len(self.agent.unresolved)))
+        else:
+            self.results.put((generation, self.DONE, mines, safes, 0))
+
+    def poll(self) -> list[tuple[str, set, set, int]]:
+        """Reports of the current generation, in order; older ones are dropped."""
+        results = []
+        while True:
+            try:
+                generation, *report = self.results.get_nowait()
+            except queue.Empty:
+                return results
+            if generation == self.generation:
+                results.append(tuple(report))
+
+
 def main():
     game = Minesweeper(BOARD_HEIGHT, BOARD_WIDTH, PROBABILITY_MINE)
-    agent = MinesweeperAI(BOARD_HEIGHT, BOARD_WIDTH)
+    agent = MinesweeperAI(BOARD_HEIGHT, BOARD_WIDTH, PROBABILITY_MINE, mine_count=len(game.mines))
+    thinker = Thinker(agent)
+    view = BoardView(game)
+    unresolved = 0
+    stalled = False
 
     while not game.won():
         for event in pygame.event.get():
@@ -203,37 +321,43 @@ def main():
             is_left_click = event.type == pygame.MOUSEBUTTONUP and event.button == IS_LEFT_CLICK
             is_right_click = event.type == pygame.MOUSEBUTTONUP and event.button == IS_RIGHT_CLICK
             if event.type == pygame.QUIT:
+                thinker.cancel()
                 pygame.quit()
                 sys.exit()
             elif ai_move_button_clicked:
-                mines, safes = agent.make_move()
-                for mine in mines:
-                    game.flagging(mine, Minesweeper.BOT)
-                    agent.mark_mine(mine)
-                for safe in safes:
-                    game.mark_safe(safe, Minesweeper.BOT)
-                    agent.mark_safe(safe)
-                    agent.add_knowledge(game.get_neighbors(safe), game.get_count(safe))
+                thinker.start(move=True)
             elif is_left_click and not game.is_flagged(cell := get_coordinate()) and ensure_coordinate(cell):
+                thinker.cancel()
                 if game.is_mine(cell):
-                    detonate(game, cell)
-                game.mark_safe(cell)
-                agent.mark_safe(cell)
-                agent.add_knowledge(game.get_neighbors(cell), game.get_count(cell))
+                    detonate(view, cell)
+                revealed = game.reveal(cell)
+                view.invalidate(revealed)
+                thinker.start((cell, game.get_count(cell)) for cell in revealed)
             elif is_right_click:
-                game.flagging(get_coordinate())
-
-        screen.fill(BACKGROUND_COLOR)
-        draw_board(TILE_COLOR)
-        draw_numbers(game.board)
-        draw_board(HIDDEN_TILE_COLOR, exclude=game.safes_found)
-        draw_flags(game.mines_found)
-        draw_right_panel(game.score)
+                game.flagging(cell := get_coordinate())
+                view.invalidate([cell])
 
-        pygame.display.flip()
+        for kind, mines, safes, unresolved in thinker.poll():
+            stalled = kind == Thinker.STALLED
+            view.outline(safes - game.safes_found)
+            if kind != Thinker.MOVE:
+                continue
+            for safe in safes:
+                if game.is_mine(safe):
+                    thinker.cancel()
+                    detonate(view, safe)
+            for mine in mines:
+                game.flagging(mine, Minesweeper.BOT)
+            revealed = [cell for safe in safes for cell in game.reveal(safe, Minesweeper.BOT)]
+            view.invalidate(itertools.chain(mines, revealed))
+            view.outline(set())
+            thinker.start(((cell, game.get_count(cell)) for cell in revealed), mines)
+
+        view.render(unresolved=unresolved, stalled=stalled)
         clock.tick(FPS)
 
-    victory(game)
+    thinker.cancel()
+    victory(view)
 
 
 if __name__ == "__main__":
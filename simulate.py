@@ -0,0 +1,205 @@
+"""Headless batch simulation of MinesweeperAI games.
+
+Example:
+    python simulate.py --games 1000 --height 16 --width 16 --probability-mine 0.15 --output results.jsonl
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, TextIO
+
+import record
+from knowledge.stats import Stats
+from minesweeper import Minesweeper, MinesweeperAI
+
+FIELDS = [
+    "seed", "height", "width", "probability_mine", "won", "moves", "guesses",
+    "revealed", "safes", "mines", "total_seconds", "mean_move_seconds", "max_move_seconds", "unresolved_moves",
+]
+
+
+def play(seed: int,
+         height: int,
+         width: int,
+         probability_mine: float,
+         mine_count: int | None = None,
+         move_budget: float | None = None,
+         profile: bool = False,
+         recording: bool = False) -> dict:
+    """Play one seeded game to completion and return its statistics.
+
+    With a `move_budget` in seconds, each inference pass stops at that budget
+    and the agent guesses if it has proven nothing by then. With `profile`,
+    the solver's counters and phase times are added under "profile", and
+    with `recording` the game itself under "record" (see record.py).
+    """
+    game = Minesweeper(height, width, probability_mine, mine_count=mine_count, rng=seed)
+    stats = Stats() if profile else None
+    agent = MinesweeperAI(height, width, game.probability_mine, mine_count=game.mine_count, stats=stats)
+
+    moves = 0
+    guesses = 0
+    unresolved_moves = 0
+    move_seconds = []
+    turns = []
+    won = True
+    mines, safes = agent.make_move()
+    while not game.won():
+        start = time.perf_counter()
+        kind = record.REVEAL
+        if not mines and not safes:
+            guess = agent.make_guess()
+            if guess is None:
+                won = False
+                break
+            guesses += 1
+            safes = {guess}
+            kind = record.GUESS
+        if recording:
+            turns.append([[record.FLAG, *mine] for mine in mines] + [[kind, *safe] for safe in safes])
+        if any(game.is_mine(safe) for safe in safes):
+            won = False
+            break
+
+        for mine in mines:
+            game.flagging(mine, Minesweeper.BOT)
+        revealed = [cell for safe in safes for cell in game.reveal(safe, Minesweeper.BOT)]
+        deadline = None if move_budget is None else time.monotonic() + move_budget
+        mines, safes = agent.observe(((cell, game.get_count(cell)) for cell in revealed), mines=mines, deadline=deadline)
+        move_seconds.append(time.perf_counter() - start)
+        moves += 1
+        unresolved_moves += bool(agent.unresolved)
+
+    result = {
+        "seed": seed,
+        "height": height,
+        "width": width,
+        "probability_mine": game.probability_mine,
+        "won": won,
+        "moves": moves,
+        "guesses": guesses,
+        "revealed": len(game.safes_found),
+        "safes": len(game.safes),
+        "mines": len(game.mines),
+        "total_seconds": sum(move_seconds),
+        "mean_move_seconds": sum(move_seconds) / len(move_seconds) if move_seconds else 0.0,
+        "max_move_seconds": max(move_seconds, default=0.0),
+        "unresolved_moves": unresolved_moves,
+    }
+    if stats is not None:
+        result["profile"] = stats.snapshot()
+    if recording:
+        result["record"] = record.game_record(game, seed, turns, won)
+    return result
+
+
+def _play(args: tuple[int, int, int, float, int | None, float | None, bool, bool]) -> dict:
+    return play(*args)
+
+
+def simulate(games: int,
+             height: int,
+             width: int,
+             probability_mine: float,
+             seed: int = 0,
+             processes: int | None = None,
+             mine_count: int | None = None,
+             move_budget: float | None = None,
+             profile: bool = False,
+             recording: bool = False) -> Iterator[dict]:
+    """Yield the result of each game, in seed order, as soon as it is available.
+
+    `processes` of 1 plays in this process; None uses one worker per CPU.
+    A `mine_count` places exactly that many mines instead of using the density.
+    """
+    tasks = ((seed + i, height, width, probability_mine, mine_count, move_budget, profile, recording)
+             for i in range(games))
+    if processes == 1:
+        yield from map(_play, tasks)
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        yield from pool.map(_play, tasks, chunksize=max(1, games // 64))
+
+
+def write(results: Iterator[dict], output: TextIO, fmt: str) -> dict:
+    """Stream `results` to `output` as JSONL or CSV and return a summary."""
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(output, FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+    games = wins = 0
+    seconds = 0.0
+    for result in results:
+        if writer is None:
+            output.write(json.dumps(result) + "\n")
+        else:
+            writer.writerow(result)
+        output.flush()
+        games += 1
+        wins += result["won"]
+        seconds += result["total_seconds"]
+
+    return {
+        "games": games,
+        "wins": wins,
+        "win_rate": wins / games if games else 0.0,
+        "solver_seconds": seconds,
+    }
+
+
+def recorded(results: Iterator[dict], output: TextIO) -> Iterator[dict]:
+    """Append the "record" of each result to `output` and yield the result without it."""
+    for result in results:
+        record.append([result.pop("record")], output)
+        yield result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=9)
+    parser.add_argument("--width", type=int, default=9)
+    parser.add_argument("--probability-mine", type=float, default=0.15)
+    parser.add_argument("--mines", type=int, default=None, help="fixed mine count (overrides the density)")
+    parser.add_argument("--move-budget", type=float, default=None,
+                        help="seconds of inference per move before the agent guesses (default: unlimited)")
+    parser.add_argument("--profile", action="store_true",
+                        help="add the solver's counters and phase times to each JSONL result")
+    parser.add_argument("--record", default=None, help="append each game to this record file (see record.py)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--output", default="-", help="output file, '-' for stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="output format (default: from the output extension, else jsonl)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    results = simulate(
+        args.games, args.height, args.width, args.probability_mine, args.seed, args.processes, args.mines,
+        args.move_budget, args.profile, args.record is not None
+    )
+    records = None if args.record is None else open(args.record, "a")
+    if records is not None:
+        results = recorded(results, records)
+    start = time.perf_counter()
+    try:
+        if args.output == "-":
+            summary = write(results, sys.stdout, fmt)
+        else:
+            with open(args.output, "w", newline="") as output:
+                summary = write(results, output, fmt)
+    finally:
+        if records is not None:
+            records.close()
+    summary["wall_seconds"] = time.perf_counter() - start
+    summary["games_per_second"] = summary["games"] / summary["wall_seconds"] if summary["wall_seconds"] else 0.0
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""Tests for the Minesweeper board and MinesweeperAI.
+
+Run from the repository root with `python -m unittest test_minesweeper`.
+"""
+import itertools
+import random
+import time
+import unittest
+
+import numpy as np
+
+from knowledge.stats import Stats
+from minesweeper import CellMask, Minesweeper, MinesweeperAI
+
+
+def opened(seed: int, height: int, width: int, reveals: int) -> tuple[Minesweeper, list[tuple[tuple[int, int], int]]]:
+    """A seeded board with `reveals` random safe cells opened, and the (cell, count) of every revealed cell."""
+    game = Minesweeper(height, width, 0.2, rng=seed)
+    safes = sorted(game.safes)
+    random.Random(seed).shuffle(safes)
+    revealed = [cell for safe in safes[:reveals] for cell in game.reveal(safe, Minesweeper.BOT)]
+    return game, [(cell, game.get_count(cell)) for cell in revealed]
+
+
+class GenerationTest(unittest.TestCase):
+    def test_fixed_mine_count(self):
+        for seed in range(10):
+            for compact in (False, True):
+                game = Minesweeper(16, 30, mine_count=99, compact=compact, rng=seed)
+                self.assertEqual(len(game.mines), 99)
+                self.assertEqual(len(game.safes), 16 * 30 - 99)
+
+    def test_counts_match_the_mines(self):
+        game = Minesweeper(12, 17, 0.3, rng=0)
+        for i, j in itertools.product(range(12), range(17)):
+            if not game.is_mine((i, j)):
+                self.assertEqual(game.get_count((i, j)), len(game.get_neighbors((i, j)) & game.mines), (i, j))
+
+    def test_same_rng_same_board(self):
+        for rng in (lambda: 7, lambda: random.Random(7), lambda: np.random.default_rng(7)):
+            for mine_count in (None, 40):
+                first = Minesweeper(16, 30, 0.2, mine_count=mine_count, rng=rng())
+                second = Minesweeper(16, 30, 0.2, mine_count=mine_count, rng=rng())
+                self.assertEqual(first.board, second.board)
+        random.seed(7)
+        first = Minesweeper(16, 30, 0.2)
+        random.seed(7)
+        self.assertEqual(Minesweeper(16, 30, 0.2).board, first.board)
+        self.assertNotEqual(Minesweeper(16, 30, 0.2, rng=8).board, Minesweeper(16, 30, 0.2, rng=7).board)
+
+    def test_first_click_opens_a_zero_region(self):
+        for seed in range(20):
+            for cell in [(0, 0), (4, 7), (8, 15)]:
+                for mine_count in (None, 60):
+                    game = Minesweeper(9, 16, 0.5, mine_count=mine_count, rng=seed, first_click=cell)
+                    self.assertFalse(game.get_neighbors(cell) & game.mines, (seed, cell))
+                    self.assertEqual(game.get_count(cell), 0)
+                    if mine_count is not None:
+                        self.assertEqual(len(game.mines), mine_count)
+        with self.assertRaises(AssertionError):
+            Minesweeper(3, 3, mine_count=1, first_click=(1, 1))
+
+    def test_layout_fixes_the_board(self):
+        game = Minesweeper(3, 4, layout=[(0, 0), (2, 3), (0, 0)])
+        self.assertEqual(game.mines, {(0, 0), (2, 3)})
+        self.assertEqual(game.mine_count, 2)
+        for cell in [(-1, 0), (0, -1), (3, 0), (0, 4)]:
+            with self.assertRaises(ValueError):
+                Minesweeper(3, 4, layout=[(1, 1), cell])
+
+
+class CellMaskTest(unittest.TestCase):
+    def test_behaves_like_a_set(self):
+        mask = CellMask(np.zeros((3, 4), dtype=bool))
+        cells = set()
+        for cell in [(0, 0), (2, 3), (0, 0), (1, 2)]:
+            mask.add(cell)
+            cells.add(cell)
+        mask.discard((2, 3))
+        cells.discard((2, 3))
+        mask.discard((2, 3))
+        self.assertEqual(len(mask), len(cells))
+        self.assertEqual(set(mask), cells)
+        self.assertEqual(mask, cells)
+        self.assertEqual(mask, CellMask(np.isin(np.arange(12), [0, 6]).reshape(3, 4)))
+        self.assertIn((1, 2), mask)
+        self.assertNotIn((2, 3), mask)
+
+    def test_cells_off_the_board(self):
+        mask = CellMask(np.ones((3, 4), dtype=bool))
+        for cell in [(-1, 0), (0, -1), (3, 0), (0, 4)]:
+            self.assertNotIn(cell, mask)
+            with self.assertRaises(IndexError):
+                mask.add(cell)
+            mask.discard(cell)
+        self.assertEqual(len(mask), 12)
+
+
+class CompactTest(unittest.TestCase):
+    def test_matches_the_set_backed_board(self):
+        for seed in range(5):
+            game = Minesweeper(9, 13, 0.2, rng=seed)
+            compact = Minesweeper(9, 13, 0.2, compact=True, rng=seed)
+            self.assertEqual(compact.board.tolist(), game.board)
+            self.assertEqual(compact.mines, game.mines)
+            self.assertEqual(compact.safes, game.safes)
+            for cell in itertools.product(range(-1, 10), range(-1, 14)):
+                self.assertEqual(compact.get_neighbors(cell), game.get_neighbors(cell), cell)
+
+    def test_won_counts_only_correct_cells(self):
+        for compact in (False, True):
+            game = Minesweeper(6, 6, layout=[(0, 0), (2, 3), (5, 5)], compact=compact)
+            for cell in game.safes - {(1, 1)}:
+                game.mark_safe(cell)
+            for cell in sorted(game.mines):
+                game.flagging(cell)
+            self.assertFalse(game.won(), compact)
+            # Flagging a safe cell is not a win, even on top of every right flag.
+            game.flagging((1, 1))
+            self.assertFalse(game.won(), compact)
+            game.flagging((1, 1))
+            game.mark_safe((1, 1))
+            self.assertTrue(game.won(), compact)
+            game.flagging((0, 0))
+            self.assertFalse(game.won(), compact)
+
+
+class NeighborTest(unittest.TestCase):
+    def test_table_matches_the_naive_loop(self):
+        for height, width in [(1, 1), (1, 5), (4, 1), (2, 2), (7, 9)]:
+            for compact in (False, True):
+                game = Minesweeper(height, width, 0.2, compact=compact, rng=0)
+                for i, j in itertools.product(range(height), range(width)):
+                    naive = [
+                        k * width + l
+                        for k in range(i - 1, i + 2)
+                        for l in range(j - 1, j + 2)
+                        if 0 <= k < height and 0 <= l < width and (k, l) != (i, j)
+                    ]
+                    self.assertEqual(game.neighbors(i * width + j), naive, (height, width, compact, i, j))
+
+    def test_table_is_built_on_first_use(self):
+        game = Minesweeper(5, 5, 0.2, rng=0)
+        self.assertIsNone(game.neighbor_offsets)
+        game.neighbors(0)
+        self.assertEqual(len(game.neighbor_offsets), 26)
+        compact = Minesweeper(5, 5, 0.2, compact=True, rng=0)
+        compact.neighbors(0)
+        self.assertIsNone(compact.neighbor_offsets)
+
+
+def reveal_one_by_one(game: Minesweeper, cell: tuple[int, int]) -> set[tuple[int, int]]:
+    """The cells a reveal of `cell` should open, found by revealing neighbours of zeros one cell at a time."""
+    opened = set()
+    pending = [cell]
+    while pending:
+        cell = pending.pop()
+        if cell in opened or cell in game.safes_found or cell in game.mines_found:
+            continue
+        opened.add(cell)
+        if game.get_count(cell) == 0:
+            pending.extend(game.get_neighbors(cell))
+    return opened
+
+
+class RevealTest(unittest.TestCase):
+    def test_flood_fill_matches_one_by_one(self):
+        for seed in range(10):
+            for compact in (False, True):
+                game = Minesweeper(20, 25, 0.12, compact=compact, rng=seed)
+                rng = random.Random(seed)
+                for cell in rng.sample(sorted(game.mines), 5):
+                    game.flagging(cell)
+                for cell in rng.sample(sorted(game.safes), 30):
+                    expected = reveal_one_by_one(game, cell)
+                    revealed = game.reveal(cell)
+                    self.assertEqual(len(revealed), len(set(revealed)))
+                    self.assertEqual(set(revealed), expected, (seed, compact, cell))
+                    self.assertLessEqual(expected, game.safes_found)
+                self.assertFalse(game.mines_found & game.safes_found)
+
+    def test_flags_stop_the_cascade(self):
+        game = Minesweeper(1, 5, layout=[])
+        game.flagging((0, 2))
+        self.assertEqual(game.reveal((0, 0)), [(0, 0), (0, 1)])
+        self.assertEqual(game.reveal((0, 0)), [])
+
+
+class ObserveTest(unittest.TestCase):
+    def test_batch_matches_one_fact_at_a_time(self):
+        for seed in range(5):
+            game, counts = opened(seed, 16, 16, 25)
+            batch = MinesweeperAI(16, 16, 0.2)
+            single = MinesweeperAI(16, 16, 0.2)
+            for cell, count in counts:
+                single.mark_safe(cell)
+                single.add_knowledge(single.neighbors(cell), count)
+            self.assertEqual(batch.observe(counts), single.make_move(), seed)
+
+
+class MineCountTest(unittest.TestCase):
+    def test_enclosed_mine_is_proven(self):
+        game = Minesweeper(4, 4, layout=[(0, 0), (0, 1), (1, 0), (1, 1)])
+        agent = MinesweeperAI(4, 4, game.probability_mine, mine_count=4)
+        revealed = game.reveal((3, 3))
+        mines, safes = agent.observe((cell, game.get_count(cell)) for cell in revealed)
+        self.assertEqual(mines, game.mines)
+        self.assertEqual(safes, set())
+
+    def test_no_mines_left_proves_the_rest_safe(self):
+        game = Minesweeper(1, 6, layout=[(0, 0)])
+        agent = MinesweeperAI(1, 6, game.probability_mine, mine_count=1)
+        counts = [((0, 1), 1), ((0, 2), 0)]
+        self.assertEqual(agent.observe(counts), ({(0, 0)}, {(0, 3), (0, 4), (0, 5)}))
+        self.assertEqual(MinesweeperAI(1, 6, game.probability_mine).observe(counts), ({(0, 0)}, {(0, 3)}))
+
+    def test_unconstrained_cells_share_the_mines_left(self):
+        game = Minesweeper(1, 6, layout=[(0, 3), (0, 5)])
+        revealed = game.reveal((0, 0))
+        counts = [(cell, game.get_count(cell)) for cell in revealed]
+        agent = MinesweeperAI(1, 6, game.probability_mine, mine_count=2)
+        self.assertEqual(agent.observe(counts), ({(0, 3)}, set()))
+        probabilities = agent.mine_probabilities()
+        self.assertEqual(probabilities[(0, 4)], 0.5)
+        self.assertEqual(probabilities[(0, 5)], 0.5)
+
+        agent = MinesweeperAI(1, 6, game.probability_mine)
+        agent.observe(counts)
+        self.assertAlmostEqual(agent.mine_probabilities()[(0, 4)], game.probability_mine)
+
+
+class AnytimeTest(unittest.TestCase):
+    def test_slices_reach_the_unlimited_answer(self):
+        game, counts = opened(1, 30, 30, 120)
+        unlimited = MinesweeperAI(30, 30, 0.2)
+        expected = unlimited.observe(counts)
+
+        agent = MinesweeperAI(30, 30, 0.2)
+        # An expired deadline leaves every cell for the slices below.
+        agent.observe(counts, deadline=time.monotonic())
+        self.assertTrue(agent.unresolved)
+        for _ in range(1000):
+            if not agent.unresolved:
+                break
+            before = len(agent.unresolved)
+            result = agent.make_move(time.monotonic() + 0.005)
+            self.assertLessEqual(len(agent.unresolved), before)
+        self.assertEqual(agent.unresolved, set())
+        self.assertEqual(result, expected)
+
+
+class CacheTest(unittest.TestCase):
+    def test_repeated_move_reuses_answers_and_provers(self):
+        game, counts = opened(2, 16, 30, 40)
+        stats = Stats()
+        agent = MinesweeperAI(16, 30, 0.2, stats=stats)
+        expected = agent.observe(counts)
+        built = stats.counters["provers.built"]
+        self.assertGreater(built, 0)
+
+        stats.reset()
+        self.assertEqual(agent.make_move(), expected)
+        self.assertEqual(stats.counters["provers.built"], 0)
+        self.assertEqual(stats.counters["cache.misses"], 0)
+        self.assertEqual(stats.counters["solver.calls"], 0)
+
+        # Cells the backbone left undetermined are answered from the cache when asked again.
+        for component in agent.knowledge.components():
+            undetermined = [p for p in component if p not in agent.discovered and p not in agent.proven]
+            if undetermined:
+                self.assertEqual(agent.knowledge.backbone(undetermined), dict.fromkeys(undetermined))
+        self.assertGreater(stats.counters["cache.hits"], 0)
+        self.assertEqual(stats.counters["cache.misses"], 0)
+        self.assertEqual(stats.counters["provers.built"], 0)
+
+    def test_slices_build_each_prover_once(self):
+        game, counts = opened(1, 30, 30, 120)
+        unlimited = Stats()
+        MinesweeperAI(30, 30, 0.2, stats=unlimited).observe(counts)
+
+        stats = Stats()
+        agent = MinesweeperAI(30, 30, 0.2, stats=stats)
+        agent.observe(counts, deadline=time.monotonic())
+        for _ in range(1000):
+            if not agent.unresolved:
+                break
+            agent.make_move(time.monotonic() + 0.005)
+        self.assertEqual(agent.unresolved, set())
+        self.assertEqual(stats.counters["provers.built"], unlimited.counters["provers.built"])
+
+
+class PoolTest(unittest.TestCase):
+    def test_answers_match_and_are_cached(self):
+        game, counts = opened(2, 16, 30, 40)
+        expected = MinesweeperAI(16, 30, 0.2).observe(counts)
+        stats = Stats()
+        agent = MinesweeperAI(16, 30, 0.2, processes=2, stats=stats)
+        try:
+            self.assertEqual(agent.observe(counts), expected)
+        finally:
+            agent.close()
+
+        stats.reset()
+        for component in agent.knowledge.components():
+            undetermined = [p for p in component if p not in agent.discovered and p not in agent.proven]
+            if undetermined:
+                self.assertEqual(agent.knowledge.backbone(undetermined), dict.fromkeys(undetermined))
+        self.assertGreater(stats.counters["cache.hits"], 0)
+        self.assertEqual(stats.counters["cache.misses"], 0)
+        self.assertEqual(stats.counters["solver.calls"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()